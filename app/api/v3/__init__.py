@@ -7,6 +7,8 @@ from .items import router as router_items
 from .sos import router as router_sos
 from .dropbox import router as router_dropbox
 from .checklist import router as router_checklist
+from .metrics import router as router_metrics
+from .audit import router as router_audit
 
 from .items_has_checklist import router as router_items_has_checklist
 
@@ -20,4 +22,6 @@ api_v3.include_router(router_client)
 api_v3.include_router(router_dropbox)
 api_v3.include_router(router_items)
 api_v3.include_router(router_sos)
-api_v3.include_router(router_user)
\ No newline at end of file
+api_v3.include_router(router_user)
+api_v3.include_router(router_metrics)
+api_v3.include_router(router_audit)
\ No newline at end of file
@@ -0,0 +1,118 @@
+import itertools
+import json
+import os
+from datetime import datetime
+from typing import Optional
+
+from dotenv import load_dotenv
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from sqlalchemy import select
+
+from app.core.dependencies import get_token_principal
+from app.core.principal import Principal
+from app.db.models import ActionLog
+from app.db.pagination import SortKey, paginate, encode_cursor
+from app.db.session import ReadSessionLocal
+from app.schemas.dtos import ActionLogOut
+
+load_dotenv()
+
+AUDIT_PAGE_SIZE_DEFAULT = int(os.getenv("AUDIT_PAGE_SIZE_DEFAULT", 500))
+AUDIT_PAGE_SIZE_MAX = int(os.getenv("AUDIT_PAGE_SIZE_MAX", 10000))
+AUDIT_STREAM_BATCH = int(os.getenv("AUDIT_STREAM_BATCH", 500))   # linhas lidas do banco/enviadas por vez
+
+# mais recentes primeiro; atendida por (user_id|action|entity, timestamp) e pela poda de partições
+AUDIT_ORDER = (SortKey(ActionLog.timestamp, desc=True), SortKey(ActionLog.id, desc=True))
+
+router = APIRouter(prefix="/audit-logs", tags=["Audit"])
+
+
+def _open_stream(stmt):
+    """
+    Abre a sessão, executa a consulta e já busca o primeiro lote: falhas aqui viram 500 antes de
+    qualquer byte ser enviado. A sessão fica aberta porque a resposta continua depois que a rota retorna.
+    """
+    db = ReadSessionLocal()
+    try:
+        result = db.execute(stmt.execution_options(stream_results=True, yield_per=AUDIT_STREAM_BATCH)).scalars()
+        first = result.fetchmany(AUDIT_STREAM_BATCH)
+    except Exception as e:
+        db.close()
+        print(f"[LOG ERROR] consulta de auditoria: {e}")
+        raise HTTPException(status_code=500, detail="Erro ao consultar a auditoria.")
+    return db, result, first
+
+
+def _stream_page(db, result, first, limit: int):
+    """
+    Gera {"items": [...], "next_cursor": ...} aos poucos, lendo do banco com cursor no servidor.
+    Se o banco falhar no meio do envio, fecha o JSON com next_cursor null e o campo "error".
+    """
+    buffer, count, last, has_more, error = [], 0, None, False, None
+    try:
+        yield '{"items":['
+        try:
+            for log in itertools.chain(first, result):
+                if count == limit:
+                    has_more = True
+                    break
+                buffer.append(ActionLogOut.model_validate(log).model_dump_json())
+                count += 1
+                last = log
+                if len(buffer) >= AUDIT_STREAM_BATCH:
+                    yield ("," if count > len(buffer) else "") + ",".join(buffer)
+                    buffer = []
+        except Exception as e:
+            print(f"[LOG ERROR] envio da auditoria interrompido após {count} registros: {e}")
+            error = "Erro ao ler a auditoria; a lista está incompleta."
+        if buffer:
+            yield ("," if count > len(buffer) else "") + ",".join(buffer)
+        if error:
+            yield '],"next_cursor":null,"error":' + json.dumps(error) + "}"
+            return
+        next_cursor = encode_cursor([k.value(last) for k in AUDIT_ORDER]) if has_more else None
+        yield '],"next_cursor":' + json.dumps(next_cursor) + "}"
+    finally:
+        db.close()
+
+
+# 🔎 Consulta da auditoria (somente admin)
+@router.get("/")
+def list_audit_logs(
+    user_id: Optional[int] = Query(None, ge=1),
+    action: Optional[str] = Query(None, description='Ação exata, ex.: "update client"'),
+    entity: Optional[str] = Query(None, description='Ex.: "client", "inspection-item"'),
+    date_from: Optional[datetime] = Query(None, description="timestamp >= date_from"),
+    date_to: Optional[datetime] = Query(None, description="timestamp < date_to"),
+    cursor: Optional[str] = Query(None, description="next_cursor da página anterior"),
+    limit: int = Query(AUDIT_PAGE_SIZE_DEFAULT, ge=1, le=AUDIT_PAGE_SIZE_MAX),
+    current_user: Principal = Depends(get_token_principal),
+):
+    """
+    Registros de auditoria filtrados por usuário, ação, entidade e período, do mais recente ao mais antigo.
+    A resposta é enviada em partes: {"items": [...], "next_cursor": "..."} (null na última página);
+    se a leitura falhar no meio do envio, a resposta termina com "next_cursor": null e "error".
+    """
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Apenas administradores.")
+
+    stmt = select(ActionLog)
+    if user_id is not None:
+        stmt = stmt.where(ActionLog.user_id == user_id)
+    if action:
+        stmt = stmt.where(ActionLog.action == action)
+    if entity:
+        stmt = stmt.where(ActionLog.entity == entity)
+    if date_from is not None:
+        stmt = stmt.where(ActionLog.timestamp >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(ActionLog.timestamp < date_to)
+
+    # cursor inválido vira 400 aqui, antes de começar a enviar a resposta
+    stmt, limit = paginate(stmt, AUDIT_ORDER, cursor, limit, max_size=AUDIT_PAGE_SIZE_MAX)
+    db, result, first = _open_stream(stmt)
+    # a task fecha a sessão também se o gerador nem chegar a rodar (cliente desconectou antes)
+    return StreamingResponse(_stream_page(db, result, first, limit), media_type="application/json",
+                             background=BackgroundTask(db.close))
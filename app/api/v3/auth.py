@@ -1,18 +1,100 @@
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException
+from jose import JWTError
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from app.db.session import get_db
-from app.schemas.dtos import Token, LoginRequest
-from app.db.crud import get_user
-from app.core.security import verify_password, create_access_token
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import get_db, get_async_db
+from app.db import crud_async
+from app.schemas.dtos import Token, LoginRequest, RefreshRequest, LogoutRequest
+from app.db.crud import get_user_by_id
+from app.core.dependencies import decode_access_token, oauth2_scheme
+from app.core.revocation import revocation_registry
+from app.core.security import (
+    verify_and_update_password, create_access_token, create_refresh_token, token_expiration,
+    decode_token, ACCESS_TOKEN_EXPIRE_MINUTES
+)
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
+
+def _issue_tokens(user) -> dict:
+    return {
+        "access_token": create_access_token(data={"sub": str(user.id)}, user=user),
+        "refresh_token": create_refresh_token(user.id),
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
+
+
 @router.post("/login", response_model=Token)
-def login(login_data: LoginRequest, db: Session = Depends(get_db)):
-    user = get_user(db, login_data.mail)
-    if not user or not verify_password(login_data.password, user.hashed_password):
+async def login(login_data: LoginRequest, db: AsyncSession = Depends(get_async_db)):
+    user = await crud_async.get_user(db, login_data.mail)
+    if not user or not user.hashed_password:
         raise HTTPException(status_code=401, detail="Credenciais inválidas")
+
+    # bcrypt roda no pool de processos dedicado; o event loop e o threadpool ficam livres
+    ok, new_hash = await verify_and_update_password(login_data.password, user.hashed_password)
+    if not ok:
+        raise HTTPException(status_code=401, detail="Credenciais inválidas")
+    if new_hash:
+        # custo do bcrypt mudou (BCRYPT_ROUNDS): regrava o hash sem exigir troca de senha
+        await crud_async.rehash_password(db, user, new_hash)
     
-    token = create_access_token(data={"sub": str(user.id)})
-    return {"access_token": token, "token_type": "bearer"}
+    return _issue_tokens(user)
+
+
+def _decode_refresh_token(refresh_token: str) -> Optional[dict]:
+    try:
+        payload = decode_token(refresh_token)
+    except JWTError:
+        return None
+    if payload.get("typ") != "refresh" or not payload.get("sub") or not payload.get("jti"):
+        return None
+    return payload
+
+
+@router.post("/refresh", response_model=Token)
+def refresh(payload: RefreshRequest, db: Session = Depends(get_db)):
+    """
+    Troca um refresh token válido por um novo par de tokens. O refresh token usado é revogado (rotação).
+    """
+    claims = _decode_refresh_token(payload.refresh_token)
+    if not claims or revocation_registry.is_revoked(claims):
+        raise HTTPException(status_code=401, detail="Refresh token inválido ou expirado")
+
+    user = get_user_by_id(db, int(claims["sub"]))
+    if not user or user.status is False:
+        raise HTTPException(status_code=401, detail="Refresh token inválido ou expirado")
+
+    revocation_registry.revoke_token(db, claims["jti"], user.id, token_expiration(claims))
+    try:
+        db.commit()
+    except IntegrityError:
+        # o mesmo refresh token foi usado em paralelo: a outra requisição já o revogou
+        db.rollback()
+        raise HTTPException(status_code=401, detail="Refresh token inválido ou expirado")
+    return _issue_tokens(user)
+
+
+@router.post("/logout", status_code=204)
+def logout(
+    payload: Optional[LogoutRequest] = None,
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+):
+    """
+    Revoga o access token atual e, se informado, o refresh token.
+    """
+    claims = decode_access_token(token)
+    if claims.get("jti"):
+        revocation_registry.revoke_token(db, claims["jti"], int(claims["sub"]), token_expiration(claims))
+
+    refresh_claims = _decode_refresh_token(payload.refresh_token) if payload and payload.refresh_token else None
+    if refresh_claims and refresh_claims["sub"] == claims["sub"]:
+        revocation_registry.revoke_token(db, refresh_claims["jti"], int(refresh_claims["sub"]),
+                                         token_expiration(refresh_claims))
+    db.commit()
+    return  # 204 No Content
 
@@ -1,21 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, Path
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Response
 from sqlalchemy.orm import Session, joinedload
-from typing import List
-
-from app.db.session import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from typing import List, Optional
+
+from app.db.session import get_db, get_read_db, get_async_read_db
+from app.db import crud_async
+from app.db.crud import checklist_filters
+from app.db.pagination import PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX, NEXT_CURSOR_HEADER
 from app.db.models import User, Checklist, ChecklistItemsInspected
-from app.core.dependencies import get_current_user
+from app.core.dependencies import get_token_principal, get_token_principal_async
+from app.core.principal import Principal
 from app.services.audit_service import log_action
 
 
 from app.schemas.dtos import (
     ChecklistCreate, ChecklistUpdate, 
-    ChecklistOut, ChecklistFullOut
+    ChecklistOut, ChecklistFullOut,
+    CHECKLIST_STATUS_LABEL_TO_CODE, CHECKLIST_STATUS_DB_TO_CODE
 )
 
-from app.db.crud import (
-    get_checklist_by_id, list_all_checklists
-)
 
 CHECKLIST_STATUS_CODE_TO_DB = {
     1: "INICIADO",
@@ -29,8 +33,18 @@ router = APIRouter(prefix="/check-list", tags=["Checklists"])
 def _is_admin(user: User) -> bool:
     return getattr(user, "is_admin", False) or str(getattr(user, "role", "")).lower() == "admin"
 
+def _status_to_db(value: str) -> str:
+    """Aceita código (1..4), label ("transporte") ou o valor do banco ("EM_TRANSPORTE")."""
+    v = str(value).strip()
+    if v.upper() in CHECKLIST_STATUS_DB_TO_CODE:
+        return v.upper()
+    code = CHECKLIST_STATUS_LABEL_TO_CODE.get(v.lower())
+    if code is None:
+        raise HTTPException(422, f"Status inválido: {value}")
+    return CHECKLIST_STATUS_CODE_TO_DB[code]
+
 @router.post("/", response_model=ChecklistOut, status_code=201)
-def create_checklist(payload: ChecklistCreate, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def create_checklist(payload: ChecklistCreate, db: Session = Depends(get_db), current_user=Depends(get_token_principal)):
     obj = Checklist(
         fk_cliente = payload.fk_cliente,
         fk_user    = current_user.id,
@@ -40,29 +54,29 @@ def create_checklist(payload: ChecklistCreate, db: Session = Depends(get_db), cu
         obs        = payload.obs,
         status     = CHECKLIST_STATUS_CODE_TO_DB[payload.status_code], 
     )
-    db.add(obj); db.commit(); db.refresh(obj)
+    db.add(obj); db.commit()
     return obj
 
 
 @router.put("/{checklist_id}", response_model=ChecklistOut)
-def update_checklist(checklist_id: int, payload: ChecklistUpdate, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def update_checklist(checklist_id: int, payload: ChecklistUpdate, db: Session = Depends(get_db), current_user=Depends(get_token_principal)):
     obj = db.get(Checklist, checklist_id)
     if not obj: raise HTTPException(404, "Checklist não encontrado.")
     data = payload.model_dump(exclude_unset=True)
     if "status_code" in data and data["status_code"] is not None:
         obj.status = CHECKLIST_STATUS_CODE_TO_DB[data.pop("status_code")] 
     for k, v in data.items(): setattr(obj, k, v)
-    db.commit(); db.refresh(obj)
+    db.commit()
     return obj
 
 
 @router.get("/checklists/{checklist_id}", response_model=ChecklistOut)
-def get_checklist_detail(
+async def get_checklist_detail(
     checklist_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: Principal = Depends(get_token_principal_async),
 ):
-    checklist = get_checklist_by_id(db=db, checklist_id=checklist_id)
+    checklist = await crud_async.get_checklist_by_id(db=db, checklist_id=checklist_id)
     if not checklist:
         raise HTTPException(status_code=404, detail="Checklist não encontrado.")
     
@@ -79,19 +93,51 @@ def get_checklist_detail(
 
 
 @router.get("/checklists/", response_model=List[ChecklistOut])
-def list_user_checklists(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def list_user_checklists(
+    response: Response,
+    status: Optional[List[str]] = Query(None, description="Código, label ou valor do status (pode repetir)"),
+    client_id: Optional[int] = Query(None, ge=1),
+    user_id: Optional[int] = Query(None, ge=1, description="Somente admin: checklists de outro usuário"),
+    all_users: bool = Query(False, description="Somente admin: checklists de todos os usuários"),
+    version_bus: Optional[str] = Query(None),
+    date_from: Optional[datetime] = Query(None, description="date_start >= date_from"),
+    date_to: Optional[datetime] = Query(None, description="date_start < date_to"),
+    cursor: Optional[str] = Query(None, description="Cursor recebido no header X-Next-Cursor"),
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: Principal = Depends(get_token_principal_async)
 ):
-    checklists = list_all_checklists(db=db, user_id=current_user.id)
+    """
+    Lista checklists com filtros opcionais (ex.: cliente X em EM_TRANSPORTE na semana, ou ?status=1&status=2
+    para os meus abertos). Sem `user_id`/`all_users`, lista os checklists do próprio usuário;
+    só admin pode consultar outros usuários.
+    """
+    if not _is_admin(current_user):
+        if all_users or (user_id is not None and user_id != current_user.id):
+            raise HTTPException(403, "Permissão negada.")
+        user_id = current_user.id
+    elif user_id is None and not all_users:
+        user_id = current_user.id
+
+    conditions = checklist_filters(
+        user_id=user_id,
+        client_id=client_id,
+        statuses=[_status_to_db(s) for s in status] if status else None,
+        version_bus=version_bus,
+        date_from=date_from,
+        date_to=date_to,
+    )
+    checklists, next_cursor = await crud_async.search_checklists(db, conditions, cursor=cursor, limit=limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return checklists
 
 
 @router.get("/{checklist_id}/full", response_model=ChecklistFullOut)
 def get_checklist_full(
     checklist_id: int = Path(..., ge=1),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_token_principal),
 ):
     # carrega checklist + itens + foto de cada item (eager load)
     obj = (
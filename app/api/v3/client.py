@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
+from app.db.pagination import PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX, NEXT_CURSOR_HEADER
 from app.core.dependencies import get_current_user
 from app.services.audit_service import log_action
 from app.db.models import  User
@@ -29,7 +30,8 @@ def create_clients(client: ClientCreate,
         previous_data={},
         current_data=client.model_dump(),
         db=db,
-        current_user=current_user
+        current_user=current_user,
+        entity="client",
     )
     return create_client(db, name=client.name, mail=client.mail, phone=client.phone)
 
@@ -37,12 +39,19 @@ def create_clients(client: ClientCreate,
 
 
 @router.get("/", response_model=List[ClientOut])
-def list_clients(db: Session = Depends(get_db),
+def list_clients(response: Response,
+                cursor: Optional[str] = Query(None, description="Cursor recebido no header X-Next-Cursor"),
+                limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+                db: Session = Depends(get_read_db),
                 current_user: User = Depends(get_current_user)):
     """
-    Retorna uma lista de todos os clientes registrados no banco de dados.
+    Retorna os clientes registrados no banco de dados, paginados por cursor.
+    O cursor da próxima página vem no header X-Next-Cursor (ausente na última página).
     """
-    return get_all_clients(db)
+    clients, next_cursor = get_all_clients(db, cursor=cursor, limit=limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return clients
 
 
 
@@ -72,7 +81,8 @@ def update_clients(
         previous_data=previous_data,
         current_data=client.model_dump(),
         db=db,
-        current_user=current_user
+        current_user=current_user,
+        entity="client",
     )
 
     return updated_client
@@ -100,7 +110,8 @@ def delete_clients(
         previous_data=previous_data,
         current_data={},
         db=db,
-        current_user=current_user
+        current_user=current_user,
+        entity="client",
     )
 
     return {"message": "Cliente removido com sucesso."}
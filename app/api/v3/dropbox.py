@@ -1,21 +1,21 @@
 from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException
 from fastapi.security import OAuth2PasswordBearer
+from fastapi.responses import JSONResponse
 from typing import List, Optional
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-# Serviços de integração com Dropbox
-from app.services.dropbox_service import (
-    upload_files_to_dropbox,
-    create_new_folder,
-    list_files_in_folder,
-    get_dropbox_access_token
-)
+# Serviços de integração com Dropbox / armazenamento
+from app.services.dropbox_service import get_dropbox_access_token
+from app.services.storage_service import create_new_folder, list_files_in_folder
 
 # Dependências e utilitários
-from app.core.dependencies import get_current_user
+from app.core.dependencies import get_current_user, get_current_user_async
 from app.services.audit_service import log_action
 from app.db.session import get_db
-from app.db.crud import save_upload
+from app.services.upload_service import store_files
+from app.services.upload_jobs import submit_upload_job, get_upload_job
+from app.db.crud import get_folder_files
 
 # Esquema OAuth2 de autenticação por token
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/v3/auth/login")
@@ -31,7 +31,8 @@ async def upload_multiple_files(
     files: List[UploadFile] = File(...),                   # Lista de arquivos recebidos
     folder_name: Optional[str] = Form(None),               # Nome da pasta opcional
     checklist_id: Optional[int] = Form(None),              # ID do checklist (opcional)
-    current_user: str = Depends(get_current_user),         # Usuário autenticado
+    background: bool = Form(False),                        # Processa o envio em segundo plano
+    current_user: str = Depends(get_current_user_async),         # Usuário autenticado
     db: Session = Depends(get_db)                          # Sessão do banco
 ):
     
@@ -39,30 +40,49 @@ async def upload_multiple_files(
     """
     Faz upload de múltiplos arquivos para o Dropbox e salva os metadados no banco.
     Opcionalmente vincula os arquivos a um checklist específico.
+    Com `background=true` os arquivos são guardados localmente e a rota responde 202 com o
+    id do job; o andamento pode ser consultado em `/upload/jobs/{job_id}`.
     """
     
     
     try:
-        # Lê o conteúdo dos arquivos
-        file_dict = {file.filename: await file.read() for file in files}
-
-        # Envia para o Dropbox
-        folder, uploaded_files = upload_files_to_dropbox(file_dict, folder_name)
-
-        # Salva metadados no banco vinculando ao usuário e (opcionalmente) ao checklist
-        saved = save_upload(
+        if background:
+            job = await run_in_threadpool(
+                submit_upload_job,
+                files=[(file.filename, file.file) for file in files],
+                folder_name=folder_name,
+                user_id=current_user.id,
+                checklist_id=checklist_id
+            )
+            return JSONResponse(status_code=202, content={
+                "message": "Upload recebido, processando em segundo plano.",
+                "job_id": job["job_id"],
+                "status": job["status"]
+            })
+
+        # Repassa os arquivos temporários: o conteúdo é lido em partes durante o envio
+        file_dict = {file.filename: file.file for file in files}
+
+        # Envia para o Dropbox (sem reenviar conteúdos já conhecidos) e salva os metadados
+        # no banco vinculando ao usuário e (opcionalmente) ao checklist, fora do event loop
+        result = await run_in_threadpool(
+            store_files,
             db=db,
-            folder_hash=folder,
-            files=uploaded_files,
+            files=file_dict,
+            folder_name=folder_name,
             user_id=current_user.id,
             checklist_id=checklist_id
         )
+        errors = result["errors"]
+        if not result["files"]:
+            raise Exception("Erro ao fazer upload: " + "; ".join(f"{e['file_name']}: {e['error']}" for e in errors))
 
         return {
-            "message": "Upload concluído!",
+            "message": "Upload concluído!" if not errors else "Upload concluído parcialmente.",
             "checklist": checklist_id,
-            "folder": folder,           
-            "files": saved
+            "folder": result["folder"],
+            "files": result["files"],
+            "errors": errors
         }
 
     except Exception as e:
@@ -70,6 +90,20 @@ async def upload_multiple_files(
 
 
 
+# ⏳ Consulta o andamento de um upload em segundo plano
+@router.get("/upload/jobs/{job_id}")
+def get_upload_job_status(job_id: str, current_user: str = Depends(get_current_user)):
+    """
+    Retorna o status do job de upload e de cada arquivo.
+    """
+    job = get_upload_job(job_id)
+    if not job or (job["user_id"] != current_user.id and not getattr(current_user, "is_admin", False)):
+        raise HTTPException(status_code=404, detail="Job de upload não encontrado.")
+    job.pop("finished_at", None)
+    return job
+
+
+
 # 📁 Cria uma nova pasta no Dropbox
 @router.post("/create-folder/")
 def create_folder(
@@ -93,12 +127,21 @@ def create_folder(
 
 # 📂 Lista os arquivos de uma pasta no Dropbox
 @router.get("/list-files/")
-def list_files(folder_hash: str, current_user: str = Depends(get_current_user)):
+def list_files(
+    folder_hash: str,
+    sync: bool = False,                                    # força conferir a pasta no Dropbox
+    current_user: str = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
     """
-    Lista os arquivos de uma pasta específica no Dropbox.
+    Lista os arquivos de uma pasta a partir do banco. O Dropbox só é consultado quando a pasta
+    não está registrada (ou com `sync=true`), e apenas para os arquivos que o banco não conhece.
     """
     try:
-        files = list_files_in_folder(folder_hash)
+        files = get_folder_files(db, folder_hash)
+        if files is None or sync:
+            known = files or {}
+            files = {**known, **list_files_in_folder(folder_hash, known_files=known)}
         return {"folder": folder_hash, "files": files}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -115,3 +158,4 @@ def get_token(current_user: str = Depends(get_current_user)):
         return {"access_token": access_token}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
+from app.db.pagination import PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX, NEXT_CURSOR_HEADER
 from app.core.dependencies import get_current_user
 from app.services.audit_service import log_action
 from app.db.models import User
@@ -32,14 +33,21 @@ def create_inspection_items(item: InspectionItemCreate,
         previous_data={},
         current_data=item.model_dump(),
         db=db,
-        current_user=current_user
+        current_user=current_user,
+        entity="inspection-item",
     )
     return create_inspection_item(db, name=item.name, status=item.status, mandatory=item.mandatory, need_for_photo=item.need_for_photo)
 
 
 @router.get("/", response_model=List[InspectionItemOut])
-def list_items(db: Session = Depends(get_db)):
-    return get_all_inspection_items(db)
+def list_items(response: Response,
+               cursor: Optional[str] = Query(None, description="Cursor recebido no header X-Next-Cursor"),
+               limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+               db: Session = Depends(get_read_db)):
+    items, next_cursor = get_all_inspection_items(db, cursor=cursor, limit=limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return items
 
 
 
@@ -78,7 +86,8 @@ def update_inspection_items(item_id: int,
         previous_data=previous_data,
         current_data=item.model_dump(),
         db=db,
-        current_user=current_user
+        current_user=current_user,
+        entity="inspection-item",
     )
     return updated_item
 
@@ -101,7 +110,8 @@ def delete_inspection_items(item_id: int,
         },
         current_data={},
         db=db,
-        current_user=current_user
+        current_user=current_user,
+        entity="inspection-item",
     )
 
     delete_inspection_item(db, item)
@@ -1,21 +1,26 @@
 # app/api/v2/checklist_items_routes.py
 from __future__ import annotations
-from fastapi import APIRouter, Depends, HTTPException, Path, status, Response
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Path, status, Response, UploadFile, File, Form
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
-from app.db.session import get_db
-from app.core.dependencies import get_current_user
+from app.db.session import get_db, get_async_db
+from app.db import crud_async
+from app.core.dependencies import get_token_principal, get_token_principal_async
+from app.core.principal import Principal
 from app.db.models import User, Checklist
 from app.db.crud import (
-    get_checklist_item,
-    add_item_to_checklist,
-    update_checklist_item,
     delete_checklist_item,
     bulk_add_items,
-    set_item_photo
+    bind_item_photos,
+    missing_inspection_items
 )
+from app.services.upload_service import store_files
 from app.schemas.dtos import (
-    ChecklistItemCreate, ChecklistItemUpdate, ChecklistItemOut, ChecklistItemsBulkCreate
+    ChecklistItemCreate, ChecklistItemUpdate, ChecklistItemOut, ChecklistItemsBulkCreate, ItemPhotosOut
 )
 
 router = APIRouter(prefix="/checklists/{checklist_id}/items", tags=["Checklist >> Items inspected" ])
@@ -31,12 +36,20 @@ def _can_touch_checklist(db: Session, checklist_id: int, current_user: User) ->
         raise HTTPException(403, "Permissão negada.")
     return obj
 
+async def _can_touch_checklist_async(db: AsyncSession, checklist_id: int, current_user: User) -> Checklist:
+    obj = await db.get(Checklist, checklist_id)
+    if not obj:
+        raise HTTPException(404, "Checklist não encontrado.")
+    if not _is_admin(current_user) and obj.fk_user != current_user.id:
+        raise HTTPException(403, "Permissão negada.")
+    return obj
+
 @router.post("", response_model=ChecklistItemOut, status_code=status.HTTP_201_CREATED)
-def create_item(
+async def create_item(
     checklist_id: int = Path(..., ge=1),
     payload: ChecklistItemCreate = ...,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_token_principal_async),
 ):
     
     def _norm_photo_id(v):
@@ -49,12 +62,12 @@ def create_item(
             return None
 
 
-    _can_touch_checklist(db, checklist_id, current_user)
+    await _can_touch_checklist_async(db, checklist_id, current_user)
     # tenta criar; se já existe, devolve 409
-    exists = get_checklist_item(db, checklist_id, payload.item_id)
+    exists = await crud_async.get_checklist_item(db, checklist_id, payload.item_id)
     if exists:
         raise HTTPException(409, "Item já vinculado a este checklist.")
-    obj = add_item_to_checklist(
+    obj = await crud_async.add_item_to_checklist(
         db,
         checklist_id=checklist_id,
         item_id=payload.item_id,
@@ -67,21 +80,21 @@ def create_item(
 
     # (opcional) garantir unicidade da foto: não deixar mesma foto em outro item
     if photo_id is not None:
-        set_item_photo(db, checklist_id=checklist_id, item_id=payload.item_id, photo_id=payload.photo_id)
+        await crud_async.set_item_photo(db, checklist_id=checklist_id, item_id=payload.item_id, photo_id=payload.photo_id)
     
     return obj
 
 @router.put("/{item_id}", response_model=ChecklistItemOut)
-def update_item(
+async def update_item(
     checklist_id: int = Path(..., ge=1),
     item_id: int = Path(..., ge=1),
     payload: ChecklistItemUpdate = ...,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_token_principal_async),
 ):
-    _can_touch_checklist(db, checklist_id, current_user)
+    await _can_touch_checklist_async(db, checklist_id, current_user)
     data = payload.model_dump(exclude_unset=True)
-    obj = update_checklist_item(db, checklist_id=checklist_id, item_id=item_id, data=data)
+    obj = await crud_async.update_checklist_item(db, checklist_id=checklist_id, item_id=item_id, data=data)
     if not obj:
         raise HTTPException(404, "Vínculo item↔checklist não encontrado.")
     return obj
@@ -91,7 +104,7 @@ def delete_item(
     checklist_id: int = Path(..., ge=1),
     item_id: int = Path(..., ge=1),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_token_principal),
 ):
     _can_touch_checklist(db, checklist_id, current_user)
     ok = delete_checklist_item(db, checklist_id=checklist_id, item_id=item_id)
@@ -104,9 +117,59 @@ def bulk_create_items(
     checklist_id: int = Path(..., ge=1),
     payload: ChecklistItemsBulkCreate = ...,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_token_principal),
 ):
     _can_touch_checklist(db, checklist_id, current_user)
     items = [it.model_dump() for it in payload.items]
     objs = bulk_add_items(db, checklist_id=checklist_id, items=items, upsert=True)
     return objs
+
+
+@router.post("/photos", response_model=ItemPhotosOut)
+async def upload_item_photos(
+    checklist_id: int = Path(..., ge=1),
+    item_ids: List[int] = Form(...),          # item_ids[i] recebe files[i]
+    files: List[UploadFile] = File(...),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_token_principal_async),
+):
+    """
+    Envia as fotos e vincula cada uma ao seu item em uma única chamada.
+    Os uploads rodam em paralelo e os `fk_photo` são gravados em uma só transação.
+    As fotos que falham (envio ou conflito) aparecem em `errors`; as demais são vinculadas.
+    """
+    if len(item_ids) != len(files):
+        raise HTTPException(422, "Informe um item_id para cada arquivo.")
+    if len(set(item_ids)) != len(item_ids):
+        raise HTTPException(422, "item_id repetido.")
+
+    await run_in_threadpool(_can_touch_checklist, db, checklist_id, current_user)
+    # valida antes de enviar: item inexistente não deixa arquivo órfão no armazenamento
+    missing = await run_in_threadpool(missing_inspection_items, db, item_ids)
+    if missing:
+        raise HTTPException(404, f"Itens de inspeção inexistentes: {missing}")
+
+    # prefixo com o item evita colisão entre fotos com o mesmo nome (ex.: image.jpg)
+    names = {f"item_{item_id}_{file.filename}": item_id for item_id, file in zip(item_ids, files)}
+    result = await run_in_threadpool(
+        store_files,
+        db=db,
+        files={name: file.file for name, file in zip(names, files)},
+        user_id=current_user.id,
+        checklist_id=checklist_id,
+    )
+    errors = [{"item_id": names.get(e["file_name"]), "file_name": e["file_name"], "error": e["error"]}
+              for e in result["errors"]]
+
+    photos, sent_as = {}, {}
+    for saved in result["files"]:
+        name = saved.get("original_name", saved["file_name"])
+        photos[names[name]] = saved["upload_file"]
+        sent_as[names[name]] = name
+    if not photos:
+        raise HTTPException(502, {"message": "Erro ao enviar fotos.", "errors": errors})
+
+    items, rejected = await run_in_threadpool(bind_item_photos, db, checklist_id=checklist_id, photos=photos)
+    errors += [{"item_id": item_id, "file_name": sent_as[item_id], "error": reason}
+               for item_id, reason in rejected.items()]
+    return {"items": items, "errors": errors}
@@ -0,0 +1,126 @@
+import os
+import secrets
+
+from dotenv import load_dotenv
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+
+from app.db.pool import get_all_pool_metrics
+from app.core.security import get_hashing_metrics, get_decode_cache_stats
+from app.services.audit_service import get_audit_stats
+from app.services.dropbox_service import get_token_cache_stats
+
+load_dotenv()
+
+# Desativado por padrão; com METRICS_TOKEN, o coletor envia "Authorization: Bearer <token>"
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").strip().lower() in ("1", "true", "yes")
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+def require_metrics_access(request: Request):
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if METRICS_TOKEN:
+        auth = request.headers.get("authorization", "")
+        token = auth[7:].strip() if auth.lower().startswith("bearer ") else ""
+        if not secrets.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+            raise HTTPException(status_code=401, detail="Token de métricas inválido.",
+                                headers={"WWW-Authenticate": "Bearer"})
+
+
+def _line(name, value, labels=None):
+    label_text = ""
+    if labels:
+        label_text = "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+    return f"{name}{label_text} {value}"
+
+
+def _db_pool_lines():
+    """Uma série por engine instrumentado (rótulo `engine`: primary, replica, async_primary...)."""
+    pools = get_all_pool_metrics()
+    series = [
+        ("gmf_db_pool_size", "gauge", "pool_size"),
+        ("gmf_db_pool_checked_out", "gauge", "checked_out"),
+        ("gmf_db_pool_checked_in", "gauge", "checked_in"),
+        ("gmf_db_pool_overflow", "gauge", "overflow"),
+        ("gmf_db_pool_overflow_events_total", "counter", "overflow_events"),
+        ("gmf_db_pool_checkout_timeouts_total", "counter", "checkout_timeouts"),
+        ("gmf_db_pool_connects_total", "counter", "connects"),
+        ("gmf_db_pool_checkout_wait_max_ms", "gauge", "checkout_wait_max_ms"),
+        ("gmf_db_pool_hold_ms_total", "counter", "hold_total_ms"),
+        ("gmf_db_pool_checkins_total", "counter", "checkins"),
+        ("gmf_db_pool_hold_max_ms", "gauge", "hold_max_ms"),
+    ]
+    lines = []
+    for name, kind, key in series:
+        lines.append(f"# TYPE {name} {kind}")
+        for engine_name, m in pools.items():
+            value = round(m[key], 3) if isinstance(m[key], float) else m[key]
+            lines.append(_line(name, value, {"engine": engine_name}))
+
+    lines.append("# TYPE gmf_db_pool_checkout_wait_ms histogram")
+    for engine_name, m in pools.items():
+        cumulative = 0
+        for bound, count in m["wait_buckets"].items():
+            cumulative += count
+            lines.append(_line("gmf_db_pool_checkout_wait_ms_bucket", cumulative, {"engine": engine_name, "le": bound}))
+        lines.append(_line("gmf_db_pool_checkout_wait_ms_sum", round(m["checkout_wait_total_ms"], 3), {"engine": engine_name}))
+        lines.append(_line("gmf_db_pool_checkout_wait_ms_count", m["checkouts"], {"engine": engine_name}))
+    return lines
+
+
+def _hashing_lines():
+    m = get_hashing_metrics()
+    return [
+        "# TYPE gmf_bcrypt_in_flight gauge", _line("gmf_bcrypt_in_flight", m["in_flight"]),
+        "# TYPE gmf_bcrypt_completed_total counter", _line("gmf_bcrypt_completed_total", m["completed"]),
+        "# TYPE gmf_bcrypt_rejected_total counter", _line("gmf_bcrypt_rejected_total", m["rejected"]),
+        "# TYPE gmf_bcrypt_latency_ms_total counter", _line("gmf_bcrypt_latency_ms_total", round(m["latency_total_ms"], 3)),
+        "# TYPE gmf_bcrypt_latency_max_ms gauge", _line("gmf_bcrypt_latency_max_ms", round(m["latency_max_ms"], 3)),
+        "# TYPE gmf_bcrypt_rehashed_total counter", _line("gmf_bcrypt_rehashed_total", m["rehashed"]),
+        "# TYPE gmf_bcrypt_workers gauge", _line("gmf_bcrypt_workers", m["workers"]),
+        "# TYPE gmf_bcrypt_max_queue gauge", _line("gmf_bcrypt_max_queue", m["max_queue"]),
+    ]
+
+
+def _decode_cache_lines():
+    m = get_decode_cache_stats()
+    return [
+        "# TYPE gmf_token_decode_cache_size gauge", _line("gmf_token_decode_cache_size", m["size"]),
+        "# TYPE gmf_token_decode_cache_hits_total counter", _line("gmf_token_decode_cache_hits_total", m["hits"]),
+        "# TYPE gmf_token_decode_cache_misses_total counter", _line("gmf_token_decode_cache_misses_total", m["misses"]),
+    ]
+
+
+def _dropbox_token_lines():
+    m = get_token_cache_stats()
+    return [
+        "# TYPE gmf_dropbox_token_hits_total counter", _line("gmf_dropbox_token_hits_total", m["hits"]),
+        "# TYPE gmf_dropbox_token_refreshes_total counter", _line("gmf_dropbox_token_refreshes_total", m["refreshes"]),
+        "# TYPE gmf_dropbox_token_errors_total counter", _line("gmf_dropbox_token_errors_total", m["errors"]),
+        "# TYPE gmf_dropbox_token_expires_in_seconds gauge", _line("gmf_dropbox_token_expires_in_seconds", m["expires_in"]),
+    ]
+
+
+def _audit_lines():
+    m = get_audit_stats()
+    return [
+        "# TYPE gmf_audit_queue_depth gauge", _line("gmf_audit_queue_depth", m["queued"]),
+        "# TYPE gmf_audit_written_total counter", _line("gmf_audit_written_total", m["written"]),
+        "# TYPE gmf_audit_batches_total counter", _line("gmf_audit_batches_total", m["batches"]),
+        "# TYPE gmf_audit_direct_writes_total counter", _line("gmf_audit_direct_writes_total", m["direct_writes"]),
+        "# TYPE gmf_audit_failed_total counter", _line("gmf_audit_failed_total", m["failed"]),
+    ]
+
+
+@router.get("", response_class=PlainTextResponse, include_in_schema=False,
+            dependencies=[Depends(require_metrics_access)])
+def metrics():
+    """
+    Métricas no formato de texto do Prometheus (pool de conexões, bcrypt, cache de tokens, token do Dropbox
+    e fila de auditoria).
+    """
+    return "\n".join(_db_pool_lines() + _hashing_lines() + _decode_cache_lines() + _dropbox_token_lines()
+                     + _audit_lines()) + "\n"
@@ -1,26 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-
-from app.db.session import get_db
-from app.core.dependencies import  get_current_user
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from app.db.session import get_async_db, get_async_read_db
+from app.db import crud_async
+from app.db.pagination import PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX, NEXT_CURSOR_HEADER
+from app.core.dependencies import get_current_user_async
 from app.db.models import User
 
 from app.schemas.dtos import (EmergencyCreate, EmergencyOut)
 
-from app.db.crud import (create_emergency_request, get_emergency_requests,
-                        get_emergency_request_by_id, verify_emergency_request)
-
 
 router = APIRouter(prefix="/sos", tags=["S.O.S"])
 
 @router.post("/", response_model=EmergencyOut)
-def create_emergency(
+async def create_emergency(
     payload: EmergencyCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
-    return create_emergency_request(
+    return await crud_async.create_emergency_request(
         db=db,
         user_id=current_user.id,
         lat=payload.lat,
@@ -29,13 +28,21 @@ def create_emergency(
 
 
 @router.get("/", response_model=List[EmergencyOut])
-def list_emergency_requests(db: Session = Depends(get_db)):
-    return get_emergency_requests(db)
+async def list_emergency_requests(
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Cursor recebido no header X-Next-Cursor"),
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    requests, next_cursor = await crud_async.get_emergency_requests(db, cursor=cursor, limit=limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return requests
 
 
 @router.put("/{request_id}/to_check", response_model=EmergencyOut)
-def to_check_emergency(request_id: int, db: Session = Depends(get_db)):
-    request = get_emergency_request_by_id(db, request_id)
+async def to_check_emergency(request_id: int, db: AsyncSession = Depends(get_async_db)):
+    request = await crud_async.get_emergency_request_by_id(db, request_id)
     if not request:
         raise HTTPException(status_code=404, detail="Solicitação de emergência não encontrada")
-    return verify_emergency_request(db, request)
+    return await crud_async.verify_emergency_request(db, request)
@@ -3,6 +3,7 @@ from fastapi import APIRouter, Response, Depends, HTTPException, Path, status
 from fastapi.responses import JSONResponse
 
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 
 
@@ -17,25 +18,26 @@ from app.schemas.dtos import (UserCreate, UserUpdate, PasswordChange,
 
 
 from app.services.audit_service import log_action
-from app.core.dependencies import get_current_user
-from app.core.security import get_password_hash
+from app.core.dependencies import get_current_user, get_current_user_async
+from app.core.security import get_password_hash_async
 
 
 
 router = APIRouter(prefix="/users", tags=["User"])
 
 @router.post("/", response_model=UserOut)
-def create(user_data: UserCreate, db: Session = Depends(get_db)):
-    if get_user(db, user_data.mail):
+async def create(user_data: UserCreate, db: Session = Depends(get_db)):
+    if await run_in_threadpool(get_user, db, user_data.mail):
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Usuário já existe")
     
-   
-  
-    return create_user(
+    # bcrypt roda no pool de processos dedicado; o event loop e o threadpool ficam livres
+    hpw = await get_password_hash_async(user_data.password)
+    return await run_in_threadpool(
+                        create_user,
                         db,
                         name=user_data.name,
                         mail=user_data.mail,                
-                        password=user_data.password,
+                        hashed_password=hpw,
                         **user_data.dict(exclude={"password", "mail", "name"})
                     )
 
@@ -51,62 +53,65 @@ def get_logged_in_user(current_user: User = Depends(get_current_user)):
 
 # --- 1) Trocar senha do PRÓPRIO usuário (/users/change-password) ---
 @router.put("/change-password", status_code=204)
-def change_my_password(
+async def change_my_password(
     payload: PasswordChange,
     db: Session = Depends(get_db),
-    current_user = Depends(get_current_user),
+    current_user = Depends(get_current_user_async),
 ):
-    hpw = get_password_hash(payload.new_password)
+    user = await run_in_threadpool(get_user_by_id, db, current_user.id)  # current_user vem do cache, sem sessão
+    if not user:
+        raise HTTPException(status_code=404, detail="Usuário não encontrado.")
+    hpw = await get_password_hash_async(payload.new_password)
    
-    update_user(db, current_user, {"hashed_password": hpw})
+    await run_in_threadpool(update_user, db, user, {"hashed_password": hpw})
     return  # 204 No Content
 
 
 # --- 2) Trocar senha por ID (admin) (/users/{user_id}/change-password) ---
 @router.put("/{user_id}/change-password", status_code=204)
-def change_password_by_id(
+async def change_password_by_id(
     user_id: int = Path(..., ge=1),
     payload: PasswordChange = ...,
     db: Session = Depends(get_db),
-    current_user = Depends(get_current_user),
+    current_user = Depends(get_current_user_async),
 ):
     is_admin = getattr(current_user, "is_admin", False)
     if not is_admin and user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Sem permissão.")
-    user = get_user_by_id(db, user_id)
+    user = await run_in_threadpool(get_user_by_id, db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="Usuário não encontrado.")
-    hpw = get_password_hash(payload.new_password)
-    update_user(db, user, {"hashed_password": hpw})
+    hpw = await get_password_hash_async(payload.new_password)
+    await run_in_threadpool(update_user, db, user, {"hashed_password": hpw})
     return  # 204 No Content
 
 
 
 @router.put("/{user_id}", response_model=UserOut)
-def update_user_route(
+async def update_user_route(
     user_id: int = Path(..., ge=1),
     payload: UserUpdate = ...,
     db: Session = Depends(get_db),
-    current_user = Depends(get_current_user),
+    current_user = Depends(get_current_user_async),
 ):
     # Autorização: o próprio usuário OU admin (ajuste a flag conforme seu modelo)
     is_admin = getattr(current_user, "is_admin", False)
     if user_id != current_user.id and not is_admin:
         raise HTTPException(status_code=403, detail="Sem permissão para editar este usuário.")
 
-    user = get_user_by_id(db, user_id)
+    user = await run_in_threadpool(get_user_by_id, db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="Usuário não encontrado.")
 
     data = payload.model_dump(exclude_unset=True)  # Pydantic v2
     # se vier 'password', converta para hashed_password e remova do payload
     if "password" in data:
-        data["hashed_password"] = get_password_hash(data.pop("password"))
+        data["hashed_password"] = await get_password_hash_async(data.pop("password"))
     # normalização de email (se aplicável)
     if "mail" in data and data["mail"]:
         data["mail"] = data["mail"].strip().lower()
 
-    updated = update_user(db, user, data)  # ou update_user_by_id(db, user_id, data)
+    updated = await run_in_threadpool(update_user, db, user, data)  # ou update_user_by_id(db, user_id, data)
     return updated
 
 
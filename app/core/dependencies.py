@@ -1,36 +1,143 @@
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
+from jose import JWTError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from app.db.session import get_db
+from app.db.session import get_db, get_async_db
 from app.db.models import User
 
-from app.core.security import SECRET_KEY, ALGORITHM
+from app.core.security import decode_token
+from app.core.principal import Principal, principal_cache, token_version_cache
+from app.core.revocation import revocation_registry
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/v2/login")
 
+
+def decode_access_token(token: str) -> dict:
+    """Decodifica e valida o access token (assinatura, expiração, tipo e revogação)."""
+    try:
+        payload = decode_token(token)
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Token inválido ou expirado")
+
+    if not payload.get("sub"):
+        raise HTTPException(status_code=401, detail="Token sem ID de usuário")
+    if payload.get("typ", "access") != "access":
+        raise HTTPException(status_code=401, detail="Token inválido ou expirado")
+    if revocation_registry.is_revoked(payload):
+        raise HTTPException(status_code=401, detail="Token revogado")
+    return payload
+
+
+async def decode_access_token_async(token: str) -> dict:
+    """Como `decode_access_token`; a sincronização periódica das revogações roda fora do event loop."""
+    if revocation_registry.sync_due():
+        await run_in_threadpool(revocation_registry.sync)
+    return decode_access_token(token)
+
+
+def _check_claims(payload: dict, version: int) -> Principal:
+    if payload.get("tv", 0) != version:
+        raise HTTPException(status_code=401, detail="Token revogado")
+    if not payload["st"]:
+        raise HTTPException(status_code=403, detail="Usuário inativo")
+    return Principal(id=int(payload["sub"]), is_admin=bool(payload["adm"]), status=True)
+
+
+def _load_principal(db: Session, user_id: int) -> Principal:
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
+
+    principal = Principal.from_user(user)
+    principal_cache.set(principal.id, principal)
+    return principal
+
+
 def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
-) -> User:
+) -> Principal:
     """
-    Retorna o objeto do usuário autenticado via token JWT.
+    Retorna o usuário autenticado via token JWT.
+    O usuário fica em cache por PRINCIPAL_CACHE_TTL, então o caso comum não consulta o banco.
     """
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("sub")
+    payload = decode_access_token(token)
+    return _load_principal(db, int(payload["sub"]))
 
-        if not user_id:
-            raise HTTPException(status_code=401, detail="Token sem ID de usuário")
 
-        user = db.query(User).filter(User.id == int(user_id)).first()
-        if not user:
+def get_token_principal(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> Principal:
+    """
+    Retorna o usuário autenticado montado apenas a partir das claims do token (id, admin, ativo).
+    Para rotas que não precisam do registro completo do usuário. A revogação é feita pela claim
+    `tv`, comparada com a versão em cache; tokens sem claims caem na consulta do usuário.
+    """
+    payload = decode_access_token(token)
+    user_id = int(payload["sub"])
+    if "adm" not in payload or "st" not in payload:
+        return _load_principal(db, user_id)
+
+    version = token_version_cache.get(user_id)
+    if version is None:
+        row = db.query(User.token_version).filter(User.id == user_id).first()
+        if not row:
             raise HTTPException(status_code=404, detail="Usuário não encontrado")
+        version = row.token_version or 0
+        token_version_cache.set(user_id, version)
 
-        return user
+    return _check_claims(payload, version)
 
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Token inválido ou expirado")
 
+# --- Versões assíncronas (AsyncSession) para as rotas `async def`: não ocupam o threadpool nem o pool síncrono ---
+async def _load_principal_async(db: AsyncSession, user_id: int) -> Principal:
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+
+    user = (await db.execute(select(User).where(User.id == user_id))).scalars().first()
+    if not user:
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
+
+    principal = Principal.from_user(user)
+    principal_cache.set(principal.id, principal)
+    return principal
+
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+) -> Principal:
+    """Igual a `get_current_user`, para rotas `async def`."""
+    payload = await decode_access_token_async(token)
+    return await _load_principal_async(db, int(payload["sub"]))
+
+
+async def get_token_principal_async(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+) -> Principal:
+    """Igual a `get_token_principal`, para rotas `async def`."""
+    payload = await decode_access_token_async(token)
+    user_id = int(payload["sub"])
+    if "adm" not in payload or "st" not in payload:
+        return await _load_principal_async(db, user_id)
+
+    version = token_version_cache.get(user_id)
+    if version is None:
+        row = (await db.execute(select(User.token_version).where(User.id == user_id))).first()
+        if not row:
+            raise HTTPException(status_code=404, detail="Usuário não encontrado")
+        version = row.token_version or 0
+        token_version_cache.set(user_id, version)
 
+    return _check_claims(payload, version)
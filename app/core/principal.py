@@ -0,0 +1,95 @@
+# core/principal.py
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Tempo (segundos) que um usuário autenticado fica em cache e quantidade máxima de entradas.
+# O cache é por processo: alterações feitas em outro processo aparecem após o TTL.
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", 60))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", 1024))
+# Cache da versão de token de cada usuário (usado pelo modo de autorização por claims)
+TOKEN_VERSION_CACHE_TTL = float(os.getenv("TOKEN_VERSION_CACHE_TTL", 300))
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Dados do usuário autenticado usados pelas rotas (sem sessão do SQLAlchemy)."""
+    id: int
+    is_admin: bool = False
+    status: bool = True
+    name: Optional[str] = None
+    mail: Optional[str] = None
+    num_cnh: Optional[str] = None
+
+    @classmethod
+    def from_user(cls, user) -> "Principal":
+        return cls(
+            id=user.id,
+            is_admin=bool(user.is_admin),
+            status=bool(user.status) if user.status is not None else True,
+            name=user.name,
+            mail=user.mail,
+            num_cnh=user.num_cnh,
+        )
+
+
+class TTLCache:
+    """Cache LRU com expiração por entrada, seguro para uso entre threads."""
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl: Optional[float] = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+principal_cache = TTLCache(ttl=PRINCIPAL_CACHE_TTL, max_size=PRINCIPAL_CACHE_SIZE)
+token_version_cache = TTLCache(ttl=TOKEN_VERSION_CACHE_TTL, max_size=PRINCIPAL_CACHE_SIZE)
+
+
+def invalidate_principal(user_id: int):
+    """Remove o usuário dos caches (chamado sempre que o usuário é alterado ou removido)."""
+    principal_cache.invalidate(int(user_id))
+    token_version_cache.invalidate(int(user_id))
@@ -0,0 +1,132 @@
+# core/revocation.py
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import event, or_
+from sqlalchemy.orm import Session
+
+from app.db.session import SessionLocal
+from app.db.models import RevokedToken
+
+load_dotenv()
+
+# Intervalo (segundos) entre as sincronizações incrementais com a tabela revoked_tokens
+REVOCATION_SYNC_SECONDS = float(os.getenv("REVOCATION_SYNC_SECONDS", 5))
+# Janela (segundos) relida a cada sincronização: ids são gerados no INSERT, não no commit, então uma
+# transação lenta pode confirmar um id menor do que outro já lido
+REVOCATION_SYNC_OVERLAP = float(os.getenv("REVOCATION_SYNC_OVERLAP", 60))
+
+
+def _timestamp(value: Optional[datetime]) -> Optional[float]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.astimezone()  # datas sem fuso são gravadas no horário local (datetime.now)
+    return value.timestamp()
+
+
+class RevocationRegistry:
+    """
+    Conjunto em memória dos tokens revogados. É carregado da tabela `revoked_tokens` e mantido
+    em dia com consultas incrementais (id > último visto, mais as gravadas nos últimos
+    REVOCATION_SYNC_OVERLAP segundos), então a verificação por requisição é só uma busca em dict.
+    Aplicar o mesmo registro duas vezes não muda nada.
+    """
+
+    def __init__(self, sync_seconds: float = REVOCATION_SYNC_SECONDS):
+        self.sync_seconds = sync_seconds
+        self._jtis = {}          # jti -> expira em (timestamp) ou None
+        self._not_before = {}    # user_id -> timestamp de corte
+        self._last_id = 0
+        self._last_sync_started = None
+        self._synced_at = 0.0
+        self._loaded = False
+        self._sync_lock = threading.Lock()
+
+    def _remember(self, jti, user_id, not_before, expires_at):
+        if jti:
+            self._jtis[jti] = _timestamp(expires_at)
+        if user_id is not None and not_before is not None:
+            cutoff = _timestamp(not_before)
+            self._not_before[user_id] = max(cutoff, self._not_before.get(user_id, 0))
+
+    def _apply(self, row):
+        self._remember(row.jti, row.user_id, row.not_before, row.expires_at)
+        self._last_id = max(self._last_id, row.id or 0)
+
+    def sync_due(self) -> bool:
+        return not self._loaded or time.monotonic() - self._synced_at >= self.sync_seconds
+
+    def sync(self, force: bool = False):
+        """Lê as revogações novas; a primeira chamada carrega a tabela inteira e descarta expiradas."""
+        if not force and not self.sync_due():
+            return
+        if not self._sync_lock.acquire(blocking=False):
+            return  # outra thread já está sincronizando
+        db = SessionLocal()
+        started = datetime.now(timezone.utc)
+        try:
+            query = db.query(RevokedToken)
+            if not self._loaded:
+                db.query(RevokedToken).filter(RevokedToken.expires_at < datetime.now(timezone.utc)) \
+                  .delete(synchronize_session=False)
+                db.commit()
+            else:
+                overlap = self._last_sync_started - timedelta(seconds=REVOCATION_SYNC_OVERLAP)
+                query = query.filter(or_(RevokedToken.id > self._last_id, RevokedToken.created_in >= overlap))
+            for row in query.order_by(RevokedToken.id.asc()).all():
+                self._apply(row)
+
+            now = time.time()
+            for jti in [j for j, exp in self._jtis.items() if exp is not None and exp < now]:
+                self._jtis.pop(jti, None)
+            self._loaded = True
+            self._last_sync_started = started
+            self._synced_at = time.monotonic()
+        except Exception as e:
+            print(f"[REVOCATION ERROR] {e}")
+        finally:
+            db.close()
+            self._sync_lock.release()
+
+    def is_revoked(self, payload: dict) -> bool:
+        self.sync()
+        jti = payload.get("jti")
+        if jti and jti in self._jtis:
+            return True
+        cutoff = self._not_before.get(int(payload.get("sub", 0)))
+        return cutoff is not None and payload.get("iat", 0) < int(cutoff)
+
+    def _add(self, db: Session, row: RevokedToken):
+        # a memória só é atualizada no commit da sessão `db` (rollback descarta)
+        db.add(row)
+        db.info.setdefault("pending_revocations", []).append(
+            (self, (row.jti, row.user_id, row.not_before, row.expires_at)))
+
+    def revoke_token(self, db: Session, jti: str, user_id: Optional[int], expires_at: Optional[datetime]):
+        """Revoga um token específico. A gravação é confirmada no commit da sessão `db`."""
+        self._add(db, RevokedToken(jti=jti, user_id=user_id, expires_at=expires_at))
+
+    def revoke_user(self, db: Session, user_id: int, lifetime_minutes: int):
+        """Revoga todos os tokens do usuário emitidos até agora."""
+        now = datetime.now(timezone.utc)
+        self._add(db, RevokedToken(user_id=user_id, not_before=now,
+                                   expires_at=now + timedelta(minutes=lifetime_minutes)))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending_revocations(session):
+    for registry, values in session.info.pop("pending_revocations", []):
+        registry._remember(*values)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_revocations(session):
+    session.info.pop("pending_revocations", None)
+
+
+revocation_registry = RevocationRegistry()
@@ -1,26 +1,196 @@
 # core/security.py
+import os
+import asyncio
+import hashlib
+import multiprocessing
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from fastapi import HTTPException
 from passlib.context import CryptContext
 from jose import jwt
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from dotenv import load_dotenv
+
+from app.core.principal import TTLCache
+
+load_dotenv()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Custo do bcrypt. Hashes com outro custo são refeitos no próximo login (rehash-on-login).
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+# Processos dedicados ao bcrypt e quantas operações podem aguardar na fila antes de recusar (503)
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", 2))
+BCRYPT_MAX_QUEUE = int(os.getenv("BCRYPT_MAX_QUEUE", 64))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
 
 
 SECRET_KEY = "gmfsu$y&h%(l&zo0y#mzw@#cfh-botucatu-sp-brazil-d6$z5lww45e&f^z+1)tk!@yf$k"  # Replace with your actual secret key
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 4320  # Token expiration time in minutes = 3 days
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 15))  # access token de curta duração
+REFRESH_TOKEN_EXPIRE_MINUTES = int(os.getenv("REFRESH_TOKEN_EXPIRE_MINUTES", 4320))  # refresh token = 3 days
+
+
+# ---------------------------------------------------------------------------
+# Pool de processos do bcrypt: o hashing não ocupa o threadpool do Starlette
+# ---------------------------------------------------------------------------
+_pool = None
+_pool_lock = threading.Lock()
+_queue_slots = threading.BoundedSemaphore(BCRYPT_MAX_QUEUE)
+_metrics_lock = threading.Lock()
+_metrics = {"in_flight": 0, "completed": 0, "rejected": 0, "rehashed": 0,
+            "latency_total_ms": 0.0, "latency_max_ms": 0.0}
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=BCRYPT_WORKERS,
+                                            mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def _hash(password):
+    return pwd_context.hash(password)
+
+
+def _verify_and_update(plain_password, hashed_password):
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+def _submit(fn, *args):
+    """Envia a operação ao pool, recusando com 503 quando a fila está cheia."""
+    if not _queue_slots.acquire(blocking=False):
+        with _metrics_lock:
+            _metrics["rejected"] += 1
+        raise HTTPException(status_code=503, detail="Servidor ocupado, tente novamente em instantes.")
+
+    with _metrics_lock:
+        _metrics["in_flight"] += 1
+    started = time.perf_counter()
+
+    def _done(_future):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        _queue_slots.release()
+        with _metrics_lock:
+            _metrics["in_flight"] -= 1
+            _metrics["completed"] += 1
+            _metrics["latency_total_ms"] += elapsed_ms
+            _metrics["latency_max_ms"] = max(_metrics["latency_max_ms"], elapsed_ms)
+
+    try:
+        future = _get_pool().submit(fn, *args)
+    except Exception:
+        _done(None)
+        raise
+    future.add_done_callback(_done)
+    return future
+
+
+def get_hashing_metrics():
+    """Profundidade da fila e latência (fila + execução) das operações de bcrypt."""
+    with _metrics_lock:
+        metrics = dict(_metrics)
+    completed = metrics["completed"]
+    metrics["latency_avg_ms"] = metrics["latency_total_ms"] / completed if completed else 0.0
+    metrics.update(workers=BCRYPT_WORKERS, max_queue=BCRYPT_MAX_QUEUE, rounds=BCRYPT_ROUNDS)
+    return metrics
 
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return _submit(_verify_and_update, plain_password, hashed_password).result()[0]
 
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return _submit(_hash, password).result()
 
 
-def create_access_token(data: dict):
-    to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+async def verify_and_update_password(plain_password, hashed_password):
+    """
+    Verifica a senha sem bloquear o event loop. Retorna (ok, novo_hash); `novo_hash` só vem
+    preenchido quando o hash salvo usa outro custo e deve ser regravado.
+    """
+    ok, new_hash = await asyncio.wrap_future(_submit(_verify_and_update, plain_password, hashed_password))
+    if new_hash:
+        with _metrics_lock:
+            _metrics["rehashed"] += 1
+    return ok, new_hash
+
+
+async def get_password_hash_async(password):
+    return await asyncio.wrap_future(_submit(_hash, password))
+
+
+def _encode_token(to_encode: dict, token_type: str, minutes: int):
+    now = datetime.utcnow()
+    to_encode.update({
+        "typ": token_type,
+        "jti": uuid.uuid4().hex,
+        "iat": int(now.replace(tzinfo=timezone.utc).timestamp()),
+        "exp": now + timedelta(minutes=minutes),
+    })
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+
+def create_access_token(data: dict, user=None):
+    """
+    Gera o JWT. Com `user`, inclui as claims assinadas `adm` (admin), `st` (ativo) e `tv`
+    (versão do token), que permitem autorizar a requisição sem consultar o usuário no banco.
+    """
+    to_encode = data.copy()
+    if user is not None:
+        to_encode.update({
+            "adm": bool(user.is_admin),
+            "st": bool(user.status) if user.status is not None else True,
+            "tv": user.token_version or 0,
+        })
+    return _encode_token(to_encode, "access", ACCESS_TOKEN_EXPIRE_MINUTES)
+
+
+def create_refresh_token(user_id: int):
+    """Gera o refresh token, usado apenas em /auth/refresh para obter um novo access token."""
+    return _encode_token({"sub": str(user_id)}, "refresh", REFRESH_TOKEN_EXPIRE_MINUTES)
+
+
+# Cache de tokens já verificados: chave = SHA-256 do token, válido até o `exp` do próprio token
+TOKEN_DECODE_CACHE_SIZE = int(os.getenv("TOKEN_DECODE_CACHE_SIZE", 4096))
+_decode_cache = TTLCache(ttl=0, max_size=TOKEN_DECODE_CACHE_SIZE)
+
+
+def decode_token(token: str) -> dict:
+    """
+    Decodifica e verifica o JWT, reaproveitando o payload de um token idêntico já verificado.
+    Levanta JWTError como `jwt.decode`. O dict retornado é compartilhado: não altere.
+    """
+    key = hashlib.sha256(token.encode()).digest()
+    payload = _decode_cache.get(key)
+    if payload is not None:
+        return payload
+
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    exp = payload.get("exp")
+    if exp:
+        ttl = exp - time.time()
+        if ttl > 0:
+            _decode_cache.set(key, payload, ttl=ttl)
+    return payload
+
+
+def get_decode_cache_stats():
+    return _decode_cache.stats()
+
+
+def token_expiration(payload: dict):
+    """Data de expiração (UTC) de um payload já decodificado."""
+    exp = payload.get("exp")
+    return datetime.fromtimestamp(exp, tz=timezone.utc) if exp else None
@@ -0,0 +1,177 @@
+"""
+Partições mensais de `action_logs` e retenção.
+Uso (cron diário): python -m app.db.audit_partitions
+"""
+import os
+import re
+from datetime import date
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+from app.db.session import engine
+
+load_dotenv()
+
+AUDIT_PARTITIONS_AHEAD = int(os.getenv("AUDIT_PARTITIONS_AHEAD", 2))    # meses futuros já criados
+AUDIT_RETENTION_MONTHS = int(os.getenv("AUDIT_RETENTION_MONTHS", 12))   # 0 mantém tudo
+AUDIT_RETENTION_MODE = os.getenv("AUDIT_RETENTION_MODE", "drop").strip().lower()  # drop | detach
+
+_PARTITION_RE = re.compile(r"^action_logs_(\d{4})(\d{2})$")
+
+
+def _add_months(d: date, months: int) -> date:
+    y, m = divmod(d.year * 12 + (d.month - 1) + months, 12)
+    return date(y, m + 1, 1)
+
+
+def _partition_name(month: date) -> str:
+    return f"action_logs_{month:%Y%m}"
+
+
+def _existing_partitions(conn) -> list:
+    rows = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = 'action_logs'"
+    ))
+    return [r[0] for r in rows]
+
+
+def create_partition(conn, month: date):
+    start = date(month.year, month.month, 1)
+    end = _add_months(start, 1)
+    name = _partition_name(start)
+    if conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is not None:
+        return
+
+    bounds = {"start": start, "end": end}
+    create = text(
+        f"CREATE TABLE {name} PARTITION OF action_logs "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+    stray = conn.execute(text(
+        "SELECT 1 FROM action_logs_default WHERE timestamp >= :start AND timestamp < :end LIMIT 1"
+    ), bounds).first() if conn.execute(text("SELECT to_regclass('action_logs_default')")).scalar() else None
+    if not stray:
+        conn.execute(create)
+        return
+
+    # linhas do mês caíram na partição padrão: move para a partição nova
+    conn.execute(text("ALTER TABLE action_logs DETACH PARTITION action_logs_default"))
+    conn.execute(create)
+    conn.execute(text(
+        "INSERT INTO action_logs SELECT * FROM action_logs_default WHERE timestamp >= :start AND timestamp < :end"
+    ), bounds)
+    conn.execute(text("DELETE FROM action_logs_default WHERE timestamp >= :start AND timestamp < :end"), bounds)
+    conn.execute(text("ALTER TABLE action_logs ATTACH PARTITION action_logs_default DEFAULT"))
+
+
+def ensure_partitions(conn, months_ahead: int = AUDIT_PARTITIONS_AHEAD):
+    """Cria a partição do mês atual e dos próximos `months_ahead` meses (idempotente)."""
+    current = date.today().replace(day=1)
+    for i in range(months_ahead + 1):
+        create_partition(conn, _add_months(current, i))
+
+
+def ensure_partitions_safely():
+    """Na subida da aplicação: garante as partições sem impedir o start se o banco recusar."""
+    try:
+        with engine.begin() as conn:
+            ensure_partitions(conn)
+    except Exception as e:
+        print(f"[LOG ERROR] partições de action_logs: {e}")
+
+
+def apply_retention(conn, months: int = AUDIT_RETENTION_MONTHS, mode: str = AUDIT_RETENTION_MODE) -> list:
+    """
+    Remove (drop) ou desanexa (detach: vira tabela avulsa, para arquivar com pg_dump) as partições
+    mensais anteriores a `months` meses. Retorna os nomes afetados.
+    """
+    if months <= 0:
+        return []
+    cutoff = _add_months(date.today().replace(day=1), -months)
+    affected = []
+    for name in _existing_partitions(conn):
+        match = _PARTITION_RE.match(name)
+        if not match or date(int(match.group(1)), int(match.group(2)), 1) >= cutoff:
+            continue
+        if mode == "detach":
+            conn.execute(text(f"ALTER TABLE action_logs DETACH PARTITION {name}"))
+        else:
+            conn.execute(text(f"DROP TABLE {name}"))
+        affected.append(name)
+    return affected
+
+
+def upgrade_action_logs(conn):
+    """
+    Converte a `action_logs` antiga (snapshots previous_data/current_data, sem partição) para a nova:
+    a antiga vira `action_logs_legacy` e as linhas são copiadas como diff por campo.
+    Não faz nada se a tabela já é particionada.
+    """
+    kind = conn.execute(text("SELECT relkind FROM pg_class WHERE relname = 'action_logs'")).scalar()
+    if kind == "p":
+        ensure_partitions(conn)
+        return
+
+    if kind == "r":
+        conn.execute(text("ALTER TABLE action_logs RENAME TO action_logs_legacy"))
+        conn.execute(text("ALTER TABLE action_logs_legacy RENAME CONSTRAINT action_logs_pkey TO action_logs_legacy_pkey"))
+        conn.execute(text("ALTER INDEX IF EXISTS ix_action_logs_id RENAME TO ix_action_logs_legacy_id"))
+
+    conn.execute(text(
+        "CREATE TABLE action_logs ("
+        " id BIGSERIAL,"
+        " user_id INTEGER REFERENCES users (id),"
+        " action VARCHAR NOT NULL,"
+        " entity VARCHAR,"
+        " changes JSONB,"
+        " timestamp TIMESTAMP WITH TIME ZONE NOT NULL,"
+        " PRIMARY KEY (id, timestamp)"
+        ") PARTITION BY RANGE (timestamp)"
+    ))
+    conn.execute(text("CREATE TABLE IF NOT EXISTS action_logs_default PARTITION OF action_logs DEFAULT"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_action_logs_user_timestamp ON action_logs (user_id, timestamp)"))
+    ensure_partitions(conn)
+
+    if kind != "r":
+        return
+
+    # partições para todo o período antigo antes de copiar (senão as linhas ficam na partição padrão)
+    first = conn.execute(text("SELECT min(timestamp) FROM action_logs_legacy")).scalar()
+    if first is not None:
+        month = first.date().replace(day=1)
+        while month < date.today().replace(day=1):
+            create_partition(conn, month)
+            month = _add_months(month, 1)
+
+    conn.execute(text("""
+        INSERT INTO action_logs (user_id, action, changes, timestamp)
+        SELECT l.user_id, l.action, d.changes, l.timestamp
+          FROM action_logs_legacy l
+          CROSS JOIN LATERAL (
+              SELECT jsonb_object_agg(k, jsonb_build_array(p -> k, c -> k)) AS changes
+                FROM (SELECT CASE WHEN jsonb_typeof(l.previous_data::jsonb) = 'object'
+                                  THEN l.previous_data::jsonb ELSE '{}'::jsonb END AS p,
+                             CASE WHEN jsonb_typeof(l.current_data::jsonb) = 'object'
+                                  THEN l.current_data::jsonb ELSE '{}'::jsonb END AS c) s
+                CROSS JOIN LATERAL (SELECT jsonb_object_keys(s.p) UNION SELECT jsonb_object_keys(s.c)) keys(k)
+               WHERE (s.p -> k) IS DISTINCT FROM (s.c -> k)
+          ) d
+         ORDER BY l.id
+    """))
+    print("ℹ️  Logs antigos copiados; depois de conferir, remova a tabela action_logs_legacy.")
+
+
+def run():
+    with engine.begin() as conn:
+        ensure_partitions(conn)
+        affected = apply_retention(conn)
+    verb = "desanexadas" if AUDIT_RETENTION_MODE == "detach" else "removidas"
+    print(f"✅ Partições de action_logs em dia; {len(affected)} {verb}: {', '.join(affected) or '-'}")
+
+
+if __name__ == "__main__":
+    run()
@@ -1,8 +1,11 @@
-from sqlalchemy import desc
+from sqlalchemy import insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
 
-from typing import List, Optional
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
 
 from app.db.models import (User, Client, InspectionItem,
                              UploadFolder, UploadFile, 
@@ -10,25 +13,52 @@ from app.db.models import (User, Client, InspectionItem,
                              Checklist, InspectionItem
                              )
 
-from app.core.security import get_password_hash
+from app.core.security import get_password_hash, REFRESH_TOKEN_EXPIRE_MINUTES
+from app.core.principal import invalidate_principal
+from app.core.revocation import revocation_registry
+from app.db.pagination import SortKey, paginate, page_result
+
+# Ordenações estáveis (id como desempate) usadas pela paginação por cursor.
+# SOS e checklists têm índice em (created_in, id); clientes e itens de inspeção são cadastros
+# pequenos (centenas de linhas) e ficam sem índice para a ordenação mista com coalesce.
+CLIENT_ORDER = (SortKey(Client.frequency_order, desc=True, default=0), SortKey(Client.name), SortKey(Client.id))
+INSPECTION_ITEM_ORDER = (
+    SortKey(InspectionItem.need_for_photo, desc=True, default=False),  # True primeiro
+    SortKey(InspectionItem.name),                                      # A→Z
+    SortKey(InspectionItem.id),
+)
+EMERGENCY_ORDER = (SortKey(EmergencyRequests.created_in, desc=True), SortKey(EmergencyRequests.id, desc=True))
+CHECKLIST_ORDER = (SortKey(Checklist.created_in, desc=True), SortKey(Checklist.id, desc=True))
 
 #====================================================================================
 # --- CRUD para User ---
 #====================================================================================
-def create_user(db: Session, mail: str, password: str, **kwargs) -> User:
-    hashed_pw = get_password_hash(password)
+def create_user(db: Session, mail: str, password: Optional[str] = None, hashed_password: Optional[str] = None, **kwargs) -> User:
+    """Aceita a senha em texto (hash calculado aqui) ou o `hashed_password` já calculado (rotas async)."""
+    hashed_pw = hashed_password or get_password_hash(password)
     user = User(mail=mail, hashed_password=hashed_pw, **kwargs)
     db.add(user)
     db.commit()
-    db.refresh(user)
     return user
 
 
+# Campos que, ao mudar, invalidam os tokens já emitidos para o usuário
+_TOKEN_SENSITIVE_FIELDS = {"hashed_password", "is_admin", "status"}
+
+
 def update_user(db: Session, user: User, data: dict):
+    # só conta o que de fato muda (senha: só quando vem um hash novo)
+    changed = {
+        k for k in _TOKEN_SENSITIVE_FIELDS & data.keys()
+        if getattr(user, k) != data[k] and (k != "hashed_password" or data[k])
+    }
     for k, v in data.items():
         setattr(user, k, v)
+    if changed:
+        user.token_version = (user.token_version or 0) + 1
+        revocation_registry.revoke_user(db, user.id, REFRESH_TOKEN_EXPIRE_MINUTES)
     db.commit()
-    db.refresh(user)
+    invalidate_principal(user.id)
     return user
 
 
@@ -41,14 +71,27 @@ def get_user_by_id(db: Session, user_id: int) -> Optional[User]:
 
 
 def delete_user(db: Session, user: User):
+    user_id = user.id
+    revocation_registry.revoke_user(db, user_id, REFRESH_TOKEN_EXPIRE_MINUTES)
     db.delete(user)
     db.commit()
+    invalidate_principal(user_id)
 
 
 def change_password(db: Session, user: User, new_password: str):
     user.hashed_password = get_password_hash(new_password)
+    user.token_version = (user.token_version or 0) + 1
+    revocation_registry.revoke_user(db, user.id, REFRESH_TOKEN_EXPIRE_MINUTES)
+    db.commit()
+    invalidate_principal(user.id)
+    return user
+
+
+def rehash_password(db: Session, user: User, new_hash: str):
+    """Regrava o hash com o custo atual do bcrypt (mesma senha: os tokens continuam válidos)."""
+    user.hashed_password = new_hash
     db.commit()
-    db.refresh(user)
+    invalidate_principal(user.id)
     return user
 
 
@@ -58,22 +101,70 @@ def user_is_admin(user: User) -> bool:
 #===================================================================================================================================
 # --- CRUD para Dropbox ---
 #===================================================================================================================================
-def save_upload(db: Session, folder_hash: str, files: dict, user_id:  Optional[int] = None,  checklist_id: Optional[int] = None):
-    folder = UploadFolder(folder_hash=folder_hash, fk_user=user_id, fk_checklist=checklist_id)
-    db.add(folder)
-    db.flush()  # garante que o folder_id é gerado antes de criar arquivos
-
-    files_saved = []
-    for file_name, file_url in files.items():
-        upload_file = UploadFile(file_name=file_name, file_url=file_url, folder=folder)
- 
-        db.add(upload_file)
-        db.flush()
-        files_saved.append({'upload_file':upload_file.id, 'file_name':upload_file.file_name, 'file_url':upload_file.file_url})
-       
+def save_upload(db: Session, folder_hash: str, files: dict, user_id:  Optional[int] = None,  checklist_id: Optional[int] = None,
+                content_hashes: Optional[dict] = None):
+    """
+    Registra a pasta e todos os arquivos com INSERT ... RETURNING: um comando para a pasta e
+    um único INSERT multi-linha para os arquivos, em vez de um flush por arquivo.
+    """
+    content_hashes = content_hashes or {}
+    folder = db.execute(
+        insert(UploadFolder)
+        .values(folder_hash=folder_hash, fk_user=user_id, fk_checklist=checklist_id)
+        .returning(UploadFolder.id, UploadFolder.folder_hash, UploadFolder.fk_user,
+                   UploadFolder.fk_checklist, UploadFolder.created_in)
+    ).one()
+
+    rows = [
+        {"file_name": file_name, "file_url": file_url, "fk_folder": folder.id,
+         "content_hash": content_hashes.get(file_name)}
+        for file_name, file_url in files.items()
+    ]
+    inserted = {}
+    if rows:
+        result = db.execute(
+            insert(UploadFile)
+            .values(rows)
+            .returning(UploadFile.id, UploadFile.file_name, UploadFile.file_url)
+        )
+        inserted = {row.file_name: row for row in result}
+
+    files_saved = [
+        {'upload_file': inserted[file_name].id, 'file_name': file_name, 'file_url': inserted[file_name].file_url}
+        for file_name in files
+    ]
     db.commit()
-    db.refresh(folder)
-    return {'folder':folder, 'files': files_saved}
+    return {'folder': dict(folder._mapping), 'files': files_saved}
+
+
+def get_upload_files_by_hashes(db: Session, hashes) -> dict:
+    """Arquivos já enviados com os content hashes informados ({hash: UploadFile})."""
+    hashes = {h for h in hashes if h}
+    if not hashes:
+        return {}
+    rows = (
+        db.query(UploadFile)
+          .filter(UploadFile.content_hash.in_(hashes))
+          .order_by(UploadFile.id.asc())
+          .all()
+    )
+    found = {}
+    for row in rows:
+        found.setdefault(row.content_hash, row)  # mantém o primeiro envio
+    return found
+
+
+def get_folder_files(db: Session, folder_hash: str) -> Optional[dict]:
+    """Arquivos conhecidos de uma pasta ({nome: link}) em uma única consulta; None se a pasta não existe."""
+    rows = (
+        db.query(UploadFolder.id, UploadFile.file_name, UploadFile.file_url)
+          .outerjoin(UploadFile, UploadFile.fk_folder == UploadFolder.id)
+          .filter(UploadFolder.folder_hash == folder_hash)
+          .all()
+    )
+    if not rows:
+        return None
+    return {row.file_name: row.file_url for row in rows if row.file_name is not None}
 
 #====================================================================================================================
 # --- CRUD para Client ---
@@ -82,7 +173,6 @@ def create_client(db: Session, name: str, mail: Optional[str] = None,  phone: Op
     client = Client(name=name, mail=mail, phone=phone)
     db.add(client)
     db.commit()
-    db.refresh(client)
     return client
 
 
@@ -90,19 +180,15 @@ def get_client_by_id(db: Session, client_id: int) -> Optional[Client]:
     return db.query(Client).filter(Client.id == client_id).first()
 
 
-def get_all_clients(db: Session) -> List[Client]:
-    return (
-        db.query(Client)
-          .order_by(desc(Client.frequency_order), Client.name.asc())  # tie-break por nome
-          .all()
-    )
+def get_all_clients(db: Session, cursor: Optional[str] = None, limit: Optional[int] = None) -> Tuple[List[Client], Optional[str]]:
+    query, limit = paginate(db.query(Client), CLIENT_ORDER, cursor, limit)
+    return page_result(query.all(), CLIENT_ORDER, limit)
 
 
 def update_client(db: Session, client: Client, updates: dict) -> Client:
     for key, value in updates.items():
         setattr(client, key, value)
     db.commit()
-    db.refresh(client)
     return client
 
 
@@ -130,20 +216,12 @@ def create_inspection_item(
     )
     db.add(item)
     db.commit()
-    db.refresh(item)
     return item
 
 
-def get_all_inspection_items(db: Session) -> List[InspectionItem]:
-    return (
-        db.query(InspectionItem)
-          .order_by(
-               InspectionItem.need_for_photo.desc(),  # True primeiro
-              InspectionItem.name.asc(),              # A→Z
-              InspectionItem.id.asc(),                # tie-break estável
-          )
-          .all()
-    )
+def get_all_inspection_items(db: Session, cursor: Optional[str] = None, limit: Optional[int] = None) -> Tuple[List[InspectionItem], Optional[str]]:
+    query, limit = paginate(db.query(InspectionItem), INSPECTION_ITEM_ORDER, cursor, limit)
+    return page_result(query.all(), INSPECTION_ITEM_ORDER, limit)
 
 
 def get_inspection_item_by_id(db: Session, item_id: int) -> Optional[InspectionItem]:
@@ -155,7 +233,6 @@ def update_inspection_item(db: Session, item: InspectionItem, updates: dict) ->
         if hasattr(item, key):
             setattr(item, key, value)
     db.commit()
-    db.refresh(item)
     return item
 
 
@@ -177,13 +254,13 @@ def create_emergency_request(db: Session, user_id: int, lat: Optional[float], lo
     
     db.add(request)
     db.commit()
-    db.refresh(request)
 
     return request
 
 
-def get_emergency_requests(db: Session) -> List[EmergencyRequests]:
-    return db.query(EmergencyRequests).all()
+def get_emergency_requests(db: Session, cursor: Optional[str] = None, limit: Optional[int] = None) -> Tuple[List[EmergencyRequests], Optional[str]]:
+    query, limit = paginate(db.query(EmergencyRequests), EMERGENCY_ORDER, cursor, limit)
+    return page_result(query.all(), EMERGENCY_ORDER, limit)
 
 
 def get_emergency_request_by_id(db: Session, request_id: int) -> Optional[EmergencyRequests]:
@@ -193,7 +270,6 @@ def get_emergency_request_by_id(db: Session, request_id: int) -> Optional[Emerge
 def verify_emergency_request(db: Session, request: EmergencyRequests) -> EmergencyRequests:
     request.checked = True
     db.commit()
-    db.refresh(request)
     return request
 
 #=====================================================================================
@@ -207,16 +283,48 @@ def get_checklist_by_id_for_user(db: Session, checklist_id: int, user: User) ->
     return q.first()
 
 
-def get_all_checklists(db: Session) -> List[Checklist]:
-    return db.query(Checklist).all()
+def get_all_checklists(db: Session, cursor: Optional[str] = None, limit: Optional[int] = None) -> Tuple[List[Checklist], Optional[str]]:
+    query, limit = paginate(db.query(Checklist), CHECKLIST_ORDER, cursor, limit)
+    return page_result(query.all(), CHECKLIST_ORDER, limit)
 
 
 def get_checklist_by_id(db: Session, checklist_id: int) -> Checklist:
     return db.query(Checklist).filter(Checklist.id == checklist_id).first()
 
 
-def list_all_checklists(db: Session, user_id: int) -> List[Checklist]:
-    return db.query(Checklist).filter(Checklist.fk_user == user_id).all()
+def checklist_filters(
+    *,
+    user_id: Optional[int] = None,
+    client_id: Optional[int] = None,
+    statuses: Optional[Sequence[str]] = None,
+    version_bus: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+) -> list:
+    """
+    Condições da listagem filtrada de checklists. Usuário, cliente, status e período são atendidos pelos
+    índices de `checklists`; `version_bus` não tem índice e só refina o resultado dos demais filtros.
+    `date_from`/`date_to` filtram `date_start` (fim exclusivo).
+    """
+    conditions = []
+    if user_id is not None:
+        conditions.append(Checklist.fk_user == user_id)
+    if client_id is not None:
+        conditions.append(Checklist.fk_cliente == client_id)
+    if statuses:
+        conditions.append(Checklist.status.in_(list(statuses)))
+    if version_bus:
+        conditions.append(Checklist.version_bus == version_bus)
+    if date_from is not None:
+        conditions.append(Checklist.date_start >= date_from)
+    if date_to is not None:
+        conditions.append(Checklist.date_start < date_to)
+    return conditions
+
+
+def search_checklists(db: Session, conditions: list, cursor: Optional[str] = None, limit: Optional[int] = None) -> Tuple[List[Checklist], Optional[str]]:
+    query, limit = paginate(db.query(Checklist).filter(*conditions), CHECKLIST_ORDER, cursor, limit)
+    return page_result(query.all(), CHECKLIST_ORDER, limit)
 
 
 #=====================================================================================
@@ -260,7 +368,6 @@ def add_item_to_checklist(
     )
     db.add(obj)
     db.commit()
-    db.refresh(obj)
     return obj
 
 def update_checklist_item(
@@ -278,7 +385,6 @@ def update_checklist_item(
     if "photo_id" in data:
         obj.fk_photo = data["photo_id"]
     db.commit()
-    db.refresh(obj)
     return obj
 
 def delete_checklist_item(db: Session, *, checklist_id: int, item_id: int) -> bool:
@@ -296,29 +402,47 @@ def bulk_add_items(
     items: List[dict],
     upsert: bool = True,
 ) -> List[ChecklistItemsInspected]:
-    """Cria vários itens; se upsert=True, atualiza status/foto se já existir."""
-    out = []
+    """
+    Cria vários itens em um único INSERT ... ON CONFLICT (uq_checklist_item) ... RETURNING.
+    Se upsert=True, atualiza status/foto dos que já existem; senão os ignora (e não os devolve).
+    Item repetido no payload: vale a última ocorrência.
+    """
+    rows = {}
     for it in items:
-        existing = get_checklist_item(db, checklist_id, it["item_id"])
-        if existing:
-            if upsert:
-                if "status" in it:   existing.status = it["status"]
-                if "photo_id" in it: existing.fk_photo = it["photo_id"]
-                out.append(existing)
-            # se não for upsert, apenas ignora
-        else:
-            obj = ChecklistItemsInspected(
-                fk_checklist=checklist_id,
-                fk_item=it["item_id"],
-                status=it.get("status", "NA"),
-                fk_photo=it.get("photo_id"),
-            )
-            db.add(obj)
-            out.append(obj)
-    db.commit()
-    # refresh opcional (se precisa de ids/fks na resposta)
-    for obj in out: db.refresh(obj)
-    return out
+        rows[it["item_id"]] = {
+            "fk_checklist": checklist_id,
+            "fk_item": it["item_id"],
+            "status": it.get("status", "NA"),
+            "fk_photo": it.get("photo_id"),
+            "created_in": datetime.now(),
+        }
+    if not rows:
+        return []
+
+    stmt = pg_insert(ChecklistItemsInspected).values(list(rows.values()))
+    if upsert:
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_checklist_item",
+            set_={"status": stmt.excluded.status, "fk_photo": stmt.excluded.fk_photo},
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(constraint="uq_checklist_item")
+    stmt = stmt.returning(*ChecklistItemsInspected.__table__.c)
+
+    try:
+        result = db.execute(
+            select(ChecklistItemsInspected)
+            .from_statement(stmt)
+            .execution_options(populate_existing=True)
+        )
+        saved = {obj.fk_item: obj for obj in result.scalars()}
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Item inexistente ou foto já vinculada a outro item.")
+
+    # mesma ordem do payload
+    return [saved[item_id] for item_id in rows if item_id in saved]
 
 def set_item_photo(db: Session, checklist_id: int, item_id: int, photo_id: int | None):
     obj = (db.query(ChecklistItemsInspected)
@@ -338,5 +462,68 @@ def set_item_photo(db: Session, checklist_id: int, item_id: int, photo_id: int |
 
     obj.fk_photo = photo_id
     db.commit()
-    db.refresh(obj)
-    return obj
\ No newline at end of file
+    return obj
+
+def missing_inspection_items(db: Session, item_ids) -> List[int]:
+    """Ids de itens de inspeção que não existem (validação antes de enviar as fotos)."""
+    item_ids = set(item_ids)
+    found = {row.id for row in db.query(InspectionItem.id).filter(InspectionItem.id.in_(item_ids)).all()}
+    return sorted(item_ids - found)
+
+
+def bind_item_photos(db: Session, *, checklist_id: int, photos: dict) -> Tuple[List[ChecklistItemsInspected], dict]:
+    """
+    Vincula fotos a itens do checklist ({item_id: upload_file_id}) em uma única transação,
+    criando o vínculo item↔checklist quando ainda não existe. Itens que não podem receber a foto
+    (item inexistente, foto repetida ou já vinculada a outro item) ficam de fora sem impedir os demais.
+    Retorna (todos os itens do checklist, {item_id: motivo} dos que ficaram de fora).
+    """
+    rejected = {}
+    seen = set()
+    for item_id, photo_id in photos.items():
+        if photo_id in seen:
+            rejected[item_id] = "A mesma foto foi enviada para mais de um item."
+        seen.add(photo_id)
+
+    for item_id in missing_inspection_items(db, photos):
+        rejected[item_id] = "Item de inspeção inexistente."
+
+    current = {
+        obj.fk_item: obj
+        for obj in db.query(ChecklistItemsInspected)
+                     .filter(ChecklistItemsInspected.fk_checklist == checklist_id,
+                             ChecklistItemsInspected.fk_item.in_(photos))
+    }
+
+    # uq_item_photo: a foto não pode estar em outro item (de qualquer checklist)
+    holders = (db.query(ChecklistItemsInspected)
+                 .filter(ChecklistItemsInspected.fk_photo.in_(photos.values()))
+                 .all())
+    held_by = {holder.fk_photo: holder for holder in holders}
+    for item_id, photo_id in photos.items():
+        holder = held_by.get(photo_id)
+        if holder and (holder.fk_checklist != checklist_id or holder.fk_item != item_id):
+            rejected.setdefault(item_id, "Foto já vinculada a outro item.")
+
+    for item_id, photo_id in photos.items():
+        if item_id in rejected:
+            continue
+        obj = current.get(item_id)
+        if obj:
+            obj.fk_photo = photo_id
+        else:
+            db.add(ChecklistItemsInspected(
+                fk_checklist=checklist_id,
+                fk_item=item_id,
+                status="NA",
+                fk_photo=photo_id,
+            ))
+    db.commit()
+
+    items = (
+        db.query(ChecklistItemsInspected)
+          .filter(ChecklistItemsInspected.fk_checklist == checklist_id)
+          .order_by(ChecklistItemsInspected.id.asc())
+          .all()
+    )
+    return items, rejected
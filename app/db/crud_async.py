@@ -0,0 +1,146 @@
+# Versões assíncronas (AsyncSession/asyncpg) das funções de app/db/crud.py usadas pelas rotas mais acessadas.
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import (User, InspectionItem, EmergencyRequests,
+                           Checklist, ChecklistItemsInspected)
+from app.core.principal import invalidate_principal
+from app.db.crud import EMERGENCY_ORDER, CHECKLIST_ORDER
+from app.db.pagination import paginate, page_result
+
+#====================================================================================
+# --- User ---
+#====================================================================================
+async def get_user(db: AsyncSession, mail: str) -> Optional[User]:
+    result = await db.execute(select(User).where(User.mail == mail))
+    return result.scalars().first()
+
+
+async def get_user_by_id(db: AsyncSession, user_id: int) -> Optional[User]:
+    return await db.get(User, user_id)
+
+
+async def rehash_password(db: AsyncSession, user: User, new_hash: str) -> User:
+    """Regrava o hash com o custo atual do bcrypt (mesma senha: os tokens continuam válidos)."""
+    user.hashed_password = new_hash
+    await db.commit()
+    invalidate_principal(user.id)
+    return user
+
+# =====================================================================================
+# --- S.O.S ---
+#======================================================================================
+async def create_emergency_request(db: AsyncSession, user_id: int, lat: Optional[float], long: Optional[float]) -> EmergencyRequests:
+    request = EmergencyRequests(fk_user=user_id, lat=lat, long=long)
+    db.add(request)
+    await db.commit()
+    return request
+
+
+async def get_emergency_requests(db: AsyncSession, cursor: Optional[str] = None, limit: Optional[int] = None) -> Tuple[List[EmergencyRequests], Optional[str]]:
+    stmt, limit = paginate(select(EmergencyRequests), EMERGENCY_ORDER, cursor, limit)
+    result = await db.execute(stmt)
+    return page_result(result.scalars().all(), EMERGENCY_ORDER, limit)
+
+
+async def get_emergency_request_by_id(db: AsyncSession, request_id: int) -> Optional[EmergencyRequests]:
+    return await db.get(EmergencyRequests, request_id)
+
+
+async def verify_emergency_request(db: AsyncSession, request: EmergencyRequests) -> EmergencyRequests:
+    request.checked = True
+    await db.commit()
+    return request
+
+#=====================================================================================
+#---- Checklist ---
+#=====================================================================================
+async def get_checklist_by_id(db: AsyncSession, checklist_id: int) -> Optional[Checklist]:
+    return await db.get(Checklist, checklist_id)
+
+
+async def search_checklists(db: AsyncSession, conditions: list, cursor: Optional[str] = None, limit: Optional[int] = None) -> Tuple[List[Checklist], Optional[str]]:
+    """Listagem filtrada; as condições vêm de `crud.checklist_filters`."""
+    stmt, limit = paginate(select(Checklist).where(*conditions), CHECKLIST_ORDER, cursor, limit)
+    result = await db.execute(stmt)
+    return page_result(result.scalars().all(), CHECKLIST_ORDER, limit)
+
+#=====================================================================================
+#---- ChecklistItemsInspected ---
+#=====================================================================================
+async def get_checklist_item(db: AsyncSession, checklist_id: int, item_id: int) -> Optional[ChecklistItemsInspected]:
+    result = await db.execute(
+        select(ChecklistItemsInspected).where(
+            ChecklistItemsInspected.fk_checklist == checklist_id,
+            ChecklistItemsInspected.fk_item == item_id,
+        )
+    )
+    return result.scalars().first()
+
+
+async def add_item_to_checklist(
+    db: AsyncSession,
+    *,
+    checklist_id: int,
+    item_id: int,
+    status: str,
+    photo_id: Optional[int],
+) -> ChecklistItemsInspected:
+    if not await db.get(Checklist, checklist_id):
+        raise ValueError("Checklist inexistente.")
+    if not await db.get(InspectionItem, item_id):
+        raise ValueError("InspectionItem inexistente.")
+
+    exists = await get_checklist_item(db, checklist_id, item_id)
+    if exists:
+        return exists
+
+    obj = ChecklistItemsInspected(
+        fk_checklist=checklist_id,
+        fk_item=item_id,
+        status=status,
+        fk_photo=photo_id,
+    )
+    db.add(obj)
+    await db.commit()
+    return obj
+
+
+async def update_checklist_item(
+    db: AsyncSession,
+    *,
+    checklist_id: int,
+    item_id: int,
+    data: dict,
+) -> Optional[ChecklistItemsInspected]:
+    obj = await get_checklist_item(db, checklist_id, item_id)
+    if not obj:
+        return None
+    if "status" in data and data["status"] is not None:
+        obj.status = data["status"]
+    if "photo_id" in data:
+        obj.fk_photo = data["photo_id"]
+    await db.commit()
+    return obj
+
+
+async def set_item_photo(db: AsyncSession, checklist_id: int, item_id: int, photo_id: Optional[int]):
+    obj = await get_checklist_item(db, checklist_id, item_id)
+    if not obj:
+        raise HTTPException(status_code=404, detail="Vínculo item↔checklist não encontrado.")
+
+    if photo_id:
+        # alguém já está usando essa foto?
+        result = await db.execute(
+            select(ChecklistItemsInspected).where(ChecklistItemsInspected.fk_photo == photo_id)
+        )
+        holder = result.scalars().first()
+        if holder and holder.id != obj.id:
+            raise HTTPException(status_code=409, detail="Foto já vinculada a outro item.")
+
+    obj.fk_photo = photo_id
+    await db.commit()
+    return obj
@@ -0,0 +1,48 @@
+from sqlalchemy import text
+
+from app.db.session import engine
+from app.db.audit_partitions import upgrade_action_logs
+
+# Alterações de schema em tabelas já existentes (create_all só cria tabelas novas).
+# Cada comando é idempotente e pode ser executado mais de uma vez.
+MIGRATIONS = [
+    # content hash dos arquivos enviados (deduplicação de uploads)
+    "ALTER TABLE upload_files ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)",
+    "CREATE INDEX IF NOT EXISTS ix_upload_files_content_hash ON upload_files (content_hash)",
+
+    # versão dos tokens do usuário (revogação no modo de autorização por claims)
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS token_version INTEGER NOT NULL DEFAULT 0",
+
+    # sincronização das revogações relê os registros recentes (janela por created_in)
+    "CREATE INDEX IF NOT EXISTS ix_revoked_tokens_created_in ON revoked_tokens (created_in)",
+
+    # listagem filtrada de checklists (usuário, cliente, status, período) com paginação por created_in
+    "CREATE INDEX IF NOT EXISTS ix_checklists_user_created ON checklists (fk_user, created_in, id)",
+    "CREATE INDEX IF NOT EXISTS ix_checklists_client_status_start ON checklists (fk_cliente, status, date_start)",
+    "CREATE INDEX IF NOT EXISTS ix_checklists_status_start ON checklists (status, date_start)",
+    "CREATE INDEX IF NOT EXISTS ix_checklists_created ON checklists (created_in, id)",
+
+    # listagem de pedidos de socorro (/v3/sos/) paginada por (created_in, id)
+    "CREATE INDEX IF NOT EXISTS ix_emergency_requests_created ON emergency_requests (created_in, id)",
+
+    # consulta de auditoria (GET /v3/audit-logs/) por ação e entidade
+    "ALTER TABLE action_logs ADD COLUMN IF NOT EXISTS entity VARCHAR",
+    "UPDATE action_logs SET entity = CASE WHEN action LIKE '%client%' THEN 'client' "
+    "WHEN action LIKE '%inspection-item%' THEN 'inspection-item' END "
+    "WHERE entity IS NULL AND (action LIKE '%client%' OR action LIKE '%inspection-item%')",
+    "CREATE INDEX IF NOT EXISTS ix_action_logs_action_timestamp ON action_logs (action, timestamp)",
+    "CREATE INDEX IF NOT EXISTS ix_action_logs_entity_timestamp ON action_logs (entity, timestamp)",
+]
+
+
+def migrate():
+    print("⏳ Aplicando migrações no banco de dados...")
+    with engine.begin() as conn:
+        # action_logs: tabela antiga -> particionada por mês com diffs em JSONB (antes das alterações abaixo)
+        upgrade_action_logs(conn)
+        for statement in MIGRATIONS:
+            conn.execute(text(statement))
+    print("✅ Migrações aplicadas com sucesso!")
+
+if __name__ == "__main__":
+    migrate()
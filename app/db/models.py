@@ -3,7 +3,9 @@
 from datetime import datetime
 from enum import Enum
 
-from sqlalchemy import (Column, String, Integer, Float, Boolean, JSON, Text, DateTime,ForeignKey, UniqueConstraint)
+from sqlalchemy import (Column, String, Integer, BigInteger, Float, Boolean, Text, DateTime,ForeignKey, UniqueConstraint, Index,
+                        DDL, event)
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 
 from app.db.session import Base
@@ -64,6 +66,9 @@ class User(Base):
     is_admin  = Column(Boolean, default=False)
     
     status = Column(Boolean, default=True)
+
+    # incrementado quando senha/perfil mudam: tokens com versão antiga deixam de valer
+    token_version = Column(Integer, default=0, server_default="0", nullable=False)
     created_in = Column(DateTime(timezone=True), default=datetime.now, nullable=False)
 
 
@@ -95,6 +100,14 @@ class Checklist(Base):
     obs = Column(Text, nullable=True)   
     created_in = Column(DateTime(timezone=True), default=datetime.now, nullable=False)
 
+    # índices da listagem filtrada/paginada (crud.checklist_filters + ordenação por created_in, id)
+    __table_args__ = (
+        Index("ix_checklists_user_created", "fk_user", "created_in", "id"),
+        Index("ix_checklists_client_status_start", "fk_cliente", "status", "date_start"),
+        Index("ix_checklists_status_start", "status", "date_start"),
+        Index("ix_checklists_created", "created_in", "id"),
+    )
+
 # OK DTO
 class UploadFolder(Base):
     __tablename__ = "upload_folders"
@@ -124,6 +137,9 @@ class UploadFile(Base):
     file_name = Column(String, nullable=False)
     file_url = Column(String, nullable=False)
 
+    # hash do conteúdo (algoritmo do Dropbox) para evitar reenvio do mesmo arquivo
+    content_hash = Column(String(64), nullable=True, index=True)
+
     fk_folder = Column(
         Integer,
         ForeignKey("upload_folders.id", ondelete="CASCADE"),
@@ -175,14 +191,48 @@ class EmergencyRequests(Base):
 
     created_in = Column(DateTime(timezone=True), default=datetime.now, nullable=False)
 
+    __table_args__ = (
+        Index("ix_emergency_requests_created", "created_in", "id"),  # paginação por cursor do /sos
+    )
+
 
 
 class ActionLog(Base):
+    """
+    Auditoria: só os campos alterados, em JSONB ({campo: [antes, depois]}).
+    Particionada por mês em `timestamp` (partições e retenção em app/db/audit_partitions.py).
+    """
     __tablename__ = "action_logs"
+    __table_args__ = (
+        Index("ix_action_logs_user_timestamp", "user_id", "timestamp"),
+        Index("ix_action_logs_action_timestamp", "action", "timestamp"),
+        Index("ix_action_logs_entity_timestamp", "entity", "timestamp"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    # a chave de partição precisa fazer parte da PK
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     action = Column(String, nullable=False)
-    previous_data = Column(JSON, nullable=True)
-    current_data = Column(JSON, nullable=True)
-    timestamp = Column(DateTime(timezone=True), default=datetime.now, nullable=False)
+    entity = Column(String, nullable=True)   # ex.: "client", "inspection-item"
+    changes = Column(JSONB, nullable=True)
+    timestamp = Column(DateTime(timezone=True), default=datetime.now, primary_key=True)
+
+
+# partição padrão: recebe o que cair fora das partições mensais já criadas
+event.listen(
+    ActionLog.__table__, "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS action_logs_default PARTITION OF action_logs DEFAULT"),
+)
+
+
+class RevokedToken(Base):
+    """Revogações de tokens: um `jti` específico ou todos os tokens do usuário emitidos antes de `not_before`."""
+    __tablename__ = "revoked_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    jti = Column(String(64), unique=True, nullable=True)
+    user_id = Column(Integer, nullable=True, index=True)
+    not_before = Column(DateTime(timezone=True), nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=True, index=True)  # depois disso o registro pode ser apagado
+    created_in = Column(DateTime(timezone=True), default=datetime.now, nullable=False, index=True)  # janela da sincronização
@@ -0,0 +1,107 @@
+# Paginação por cursor (keyset): cada página filtra "depois da última linha vista" pela ordenação,
+# em vez de OFFSET, então o custo da página não cresce com o tamanho da tabela.
+import base64
+import json
+import os
+from datetime import datetime
+from typing import Any, List, NamedTuple, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from sqlalchemy import and_, func, or_, tuple_
+
+load_dotenv()
+
+PAGE_SIZE_DEFAULT = int(os.getenv("PAGE_SIZE_DEFAULT", "50"))
+PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", "200"))
+
+# Header com o cursor da próxima página (ausente na última página)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class SortKey(NamedTuple):
+    """Coluna da ordenação. `default` substitui NULL (o cursor precisa de valores comparáveis)."""
+    column: Any
+    desc: bool = False
+    default: Any = None
+
+    @property
+    def expr(self):
+        return self.column if self.default is None else func.coalesce(self.column, self.default)
+
+    def value(self, row):
+        v = getattr(row, self.column.key)
+        return self.default if v is None else v
+
+
+def clamp_page_size(limit: Optional[int], max_size: int = PAGE_SIZE_MAX) -> int:
+    if not limit or limit < 1:
+        return min(PAGE_SIZE_DEFAULT, max_size)
+    return min(limit, max_size)
+
+
+def _to_json(v):
+    if isinstance(v, datetime):
+        return {"dt": v.isoformat()}
+    return v
+
+
+def _from_json(v):
+    if isinstance(v, dict) and "dt" in v:
+        return datetime.fromisoformat(v["dt"])
+    return v
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps([_to_json(v) for v in values], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = [_from_json(v) for v in json.loads(raw)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido.")
+    if len(values) != size:
+        raise HTTPException(status_code=400, detail="Cursor inválido.")
+    return values
+
+
+def _after(keys: Sequence[SortKey], values: Sequence[Any]):
+    """Predicado "vem depois de `values`" na ordenação de `keys`."""
+    if all(k.desc == keys[0].desc for k in keys):
+        # mesma direção em todas as colunas: comparação de tupla (usa o índice composto)
+        left = tuple_(*[k.expr for k in keys])
+        right = tuple_(*values)
+        return left < right if keys[0].desc else left > right
+
+    # direções mistas: (a > x) OR (a = x AND b < y) OR ...
+    clauses = []
+    for i, key in enumerate(keys):
+        eq = [keys[j].expr == values[j] for j in range(i)]
+        cmp = key.expr < values[i] if key.desc else key.expr > values[i]
+        clauses.append(and_(*eq, cmp))
+    return or_(*clauses)
+
+
+def paginate(query, keys: Sequence[SortKey], cursor: Optional[str] = None, limit: Optional[int] = None,
+             max_size: int = PAGE_SIZE_MAX):
+    """
+    Aplica cursor, ordenação e limite a uma Query (sync) ou select() (async).
+    Busca uma linha a mais para saber se existe próxima página; use `page_result` no resultado.
+    """
+    limit = clamp_page_size(limit, max_size)
+    if cursor:
+        query = query.filter(_after(keys, decode_cursor(cursor, len(keys))))
+    order = [k.expr.desc() if k.desc else k.expr.asc() for k in keys]
+    return query.order_by(*order).limit(limit + 1), limit
+
+
+def page_result(rows: Sequence[Any], keys: Sequence[SortKey], limit: int) -> Tuple[List[Any], Optional[str]]:
+    """Corta a linha extra e devolve (linhas, cursor da próxima página ou None)."""
+    rows = list(rows)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor([k.value(rows[-1]) for k in keys])
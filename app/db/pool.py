@@ -0,0 +1,137 @@
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Faixas (ms) do histograma de espera por conexão
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_lock = threading.Lock()
+# nome do engine (rótulo nas métricas) -> (engine, contadores)
+_engines = {}
+
+
+def _new_metrics():
+    return {
+        "checkouts": 0,
+        "checkout_wait_total_ms": 0.0,
+        "checkout_wait_max_ms": 0.0,
+        "checkout_timeouts": 0,
+        "overflow_events": 0,
+        "checkins": 0,
+        "hold_total_ms": 0.0,
+        "hold_max_ms": 0.0,
+        "connects": 0,
+        "wait_buckets": [0] * (len(WAIT_BUCKETS_MS) + 1),  # última posição = +Inf
+    }
+
+
+class _InstrumentedPoolMixin:
+    """Mede quanto tempo cada requisição espera por uma conexão livre (contadores do engine dono do pool)."""
+
+    _gmf_metrics = None  # preenchido por instrument_engine
+
+    def _do_get(self):
+        metrics = self._gmf_metrics
+        if metrics is None:
+            return super()._do_get()
+
+        overflow_before = self._overflow
+        started = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            with _lock:
+                metrics["checkout_timeouts"] += 1
+            raise
+
+        waited_ms = (time.perf_counter() - started) * 1000
+        with _lock:
+            metrics["checkouts"] += 1
+            metrics["checkout_wait_total_ms"] += waited_ms
+            metrics["checkout_wait_max_ms"] = max(metrics["checkout_wait_max_ms"], waited_ms)
+            buckets = metrics["wait_buckets"]
+            for index, bound in enumerate(WAIT_BUCKETS_MS):
+                if waited_ms <= bound:
+                    buckets[index] += 1
+                    break
+            else:
+                buckets[-1] += 1
+            # conexão extra além de pool_size (max_overflow)
+            if self._overflow > overflow_before and self._overflow > 0:
+                metrics["overflow_events"] += 1
+        return conn
+
+    def recreate(self):
+        # engine.dispose() troca o pool: o novo continua somando nos mesmos contadores
+        pool = super().recreate()
+        pool._gmf_metrics = self._gmf_metrics
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    """QueuePool (engines síncronos) com as métricas de espera."""
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    """Pool dos engines assíncronos (asyncpg) com as mesmas métricas."""
+
+
+def instrument_engine(engine, name: str = "primary"):
+    """
+    Registra o engine (sync ou async) nas métricas com o rótulo `name` e os eventos do pool que medem
+    o tempo em que cada conexão fica emprestada. O engine precisa usar um dos pools instrumentados.
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+    metrics = _new_metrics()
+    sync_engine.pool._gmf_metrics = metrics
+    with _lock:
+        _engines[name] = (engine, metrics)
+
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        with _lock:
+            metrics["connects"] += 1
+
+    @event.listens_for(sync_engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checkout_at"] = time.perf_counter()
+
+    @event.listens_for(sync_engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        checkout_at = connection_record.info.pop("checkout_at", None)
+        if checkout_at is None:
+            return
+        held_ms = (time.perf_counter() - checkout_at) * 1000
+        with _lock:
+            metrics["checkins"] += 1
+            metrics["hold_total_ms"] += held_ms
+            metrics["hold_max_ms"] = max(metrics["hold_max_ms"], held_ms)
+
+    return engine
+
+
+def get_pool_metrics(engine) -> dict:
+    """Contadores acumulados e o estado atual do pool do engine."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    pool = sync_engine.pool
+    with _lock:
+        metrics = dict(getattr(pool, "_gmf_metrics", None) or _new_metrics())
+        buckets = list(metrics.pop("wait_buckets"))
+    metrics.update(
+        pool_size=pool.size(),
+        checked_out=pool.checkedout(),
+        checked_in=pool.checkedin(),
+        overflow=max(pool.overflow(), 0),
+        wait_buckets=dict(zip([*map(str, WAIT_BUCKETS_MS), "+Inf"], buckets)),
+    )
+    return metrics
+
+
+def get_all_pool_metrics() -> dict:
+    """Métricas de todos os engines instrumentados: {nome: métricas}."""
+    with _lock:
+        engines = dict(_engines)
+    return {name: get_pool_metrics(engine) for name, (engine, _) in engines.items()}
@@ -0,0 +1,64 @@
+# Política de leitura em réplica: depois de uma escrita, o mesmo usuário continua lendo do primário
+# por READ_AFTER_WRITE_STICKY_SECONDS (lê o que acabou de gravar mesmo com a réplica atrasada).
+# A marca vai em memória do processo e também num cookie da resposta, para valer em qualquer worker
+# que atenda a próxima leitura (clientes sem cookie dependem só da memória do worker que gravou).
+import os
+from typing import Optional
+
+from dotenv import load_dotenv
+from fastapi import Request
+
+from app.core.principal import TTLCache
+from app.core.security import decode_token
+
+load_dotenv()
+
+READ_AFTER_WRITE_STICKY_SECONDS = float(os.getenv("READ_AFTER_WRITE_STICKY_SECONDS", 5))  # 0 desativa
+READ_AFTER_WRITE_MAX_USERS = int(os.getenv("READ_AFTER_WRITE_MAX_USERS", 10000))
+
+_SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# cookie com a marca de escrita recente (expira junto com a janela)
+READ_AFTER_WRITE_COOKIE = "gmf_read_primary"
+
+# usuários que escreveram recentemente (memória do processo; cada worker decide pelo que ele mesmo atendeu)
+_recent_writers = TTLCache(ttl=READ_AFTER_WRITE_STICKY_SECONDS, max_size=READ_AFTER_WRITE_MAX_USERS)
+
+
+def _client_key(request: Request) -> Optional[str]:
+    """Usuário do token (sub); sem token válido, o IP do cliente."""
+    auth = request.headers.get("authorization", "")
+    if auth.lower().startswith("bearer "):
+        try:
+            sub = decode_token(auth[7:].strip()).get("sub")
+        except Exception:
+            sub = None
+        if sub:
+            return f"user:{sub}"
+    return f"ip:{request.client.host}" if request.client else None
+
+
+def mark_write(request: Request):
+    key = _client_key(request)
+    if key and READ_AFTER_WRITE_STICKY_SECONDS > 0:
+        _recent_writers.set(key, True)
+
+
+def prefers_primary(request: Request) -> bool:
+    """True se o cliente escreveu há menos de READ_AFTER_WRITE_STICKY_SECONDS."""
+    if READ_AFTER_WRITE_STICKY_SECONDS <= 0:
+        return False
+    if request.cookies.get(READ_AFTER_WRITE_COOKIE):
+        return True
+    key = _client_key(request)
+    return bool(key) and _recent_writers.get(key) is not None
+
+
+async def read_after_write_middleware(request: Request, call_next):
+    response = await call_next(request)
+    if request.method not in _SAFE_METHODS and response.status_code < 400:
+        mark_write(request)
+        if READ_AFTER_WRITE_STICKY_SECONDS > 0:
+            response.set_cookie(READ_AFTER_WRITE_COOKIE, "1", max_age=max(int(READ_AFTER_WRITE_STICKY_SECONDS), 1),
+                                httponly=True, samesite="lax")
+    return response
@@ -1,8 +1,13 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
 
 from app.api.v3 import api_v3
 from fastapi.openapi.utils import get_openapi
+from app.services.storage_service import STORAGE_BACKEND, LOCAL_STORAGE_DIR, LOCAL_STORAGE_BASE_URL
+from app.db.read_routing import read_after_write_middleware
+from app.services.audit_service import start_audit_writer, stop_audit_writer
+from app.db.audit_partitions import ensure_partitions_safely
 
 app = FastAPI(
     title="Upload Dropbox API",
@@ -42,11 +47,24 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # cursor da próxima página nas listagens
 )
 
+# Leituras logo após uma escrita do mesmo usuário ficam no primário (réplica pode estar atrasada)
+app.middleware("http")(read_after_write_middleware)
+
+# Gravação em lote dos logs de auditoria: inicia com a aplicação e esvazia a fila no shutdown
+app.add_event_handler("startup", ensure_partitions_safely)
+app.add_event_handler("startup", start_audit_writer)
+app.add_event_handler("shutdown", stop_audit_writer)
+
 # Rotas da API
 app.include_router(api_v3)
 
+# Arquivos do backend de armazenamento local (quando os links apontam para esta API)
+if STORAGE_BACKEND == "local" and LOCAL_STORAGE_BASE_URL.startswith("/"):
+    app.mount(LOCAL_STORAGE_BASE_URL, StaticFiles(directory=LOCAL_STORAGE_DIR, check_dir=False), name="files")
+
 
 """
 # Rota raiz para servir um index.html (opcional)
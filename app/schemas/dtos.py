@@ -123,6 +123,17 @@ class ChecklistItemsBulkCreate(DTO):
     items: List[ChecklistItemCreate]
 
 
+class ItemPhotoError(DTO):
+    item_id: Optional[int] = None
+    file_name: str
+    error: str
+
+class ItemPhotosOut(DTO):
+    # itens do checklist após o vínculo e as fotos que ficaram de fora (envio falhou ou conflito)
+    items: List[ChecklistItemOut]
+    errors: List[ItemPhotoError] = []
+
+
 
 # =============================================================
 # Schemas – Login
@@ -135,6 +146,14 @@ class LoginRequest(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str = "Bearer"
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None   # validade do access token, em segundos
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
 
 
 
@@ -403,3 +422,15 @@ class ChecklistFullOut(DTO):
         default_factory=list,
         validation_alias=AliasChoices("items", "itens"),
     )
+
+# =============================================================
+# Schemas – Auditoria
+# =============================================================
+
+class ActionLogOut(DTO):
+    id: int
+    user_id: Optional[int] = None
+    action: str
+    entity: Optional[str] = None
+    changes: Optional[dict] = None   # {campo: [antes, depois]}
+    timestamp: datetime
@@ -1,24 +1,178 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
+
 from app.db.models import ActionLog, User
+from app.db.session import engine
+
+load_dotenv()
+
+# Os registros vão para uma fila em memória e uma thread grava em lotes (INSERT multi-linha),
+# fora da transação e do tempo de resposta da requisição.
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", 10000))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", 200))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", 1.0))    # segundos até gravar um lote incompleto
+AUDIT_ENQUEUE_TIMEOUT = float(os.getenv("AUDIT_ENQUEUE_TIMEOUT", 0.5))  # espera com a fila cheia antes de gravar direto
+AUDIT_WRITE_RETRIES = 3
+
+_queue = queue.Queue(maxsize=AUDIT_QUEUE_SIZE)
+_stop = threading.Event()
+_writer = None
+_writer_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {"enqueued": 0, "written": 0, "batches": 0, "direct_writes": 0, "failed": 0}
+
+
+def _count(key, n=1):
+    with _stats_lock:
+        _stats[key] += n
+
+
+def _insert(rows):
+    with engine.begin() as conn:
+        conn.execute(insert(ActionLog), rows)
+
+
+def _write_rows(rows):
+    """
+    Um único INSERT multi-linha, com novas tentativas para falhas passageiras. Se o lote continuar
+    falhando, grava registro a registro: só o registro inválido é descartado (e aparece no log).
+    Retorna quantos registros foram gravados.
+    """
+    for attempt in range(1, AUDIT_WRITE_RETRIES + 1):
+        try:
+            _insert(rows)
+            return len(rows)
+        except Exception as e:
+            print(f"[LOG ERROR] lote de {len(rows)} registros (tentativa {attempt}): {e}")
+            time.sleep(0.2 * attempt)
+    if len(rows) == 1:
+        print(f"[LOG ERROR] registro de auditoria descartado: {rows[0]!r}")
+        _count("failed")
+        return 0
+
+    written = 0
+    for row in rows:
+        try:
+            _insert([row])
+            written += 1
+        except Exception as e:
+            print(f"[LOG ERROR] registro de auditoria descartado: {row!r} ({e})")
+            _count("failed")
+    return written
+
+
+def _drain(max_items):
+    rows = []
+    while len(rows) < max_items:
+        try:
+            rows.append(_queue.get_nowait())
+        except queue.Empty:
+            break
+    return rows
+
+
+def _writer_loop():
+    while not (_stop.is_set() and _queue.empty()):
+        try:
+            first = _queue.get(timeout=AUDIT_FLUSH_INTERVAL)
+        except queue.Empty:
+            continue
+        rows = [first] + _drain(AUDIT_BATCH_SIZE - 1)
+        deadline = time.monotonic() + AUDIT_FLUSH_INTERVAL
+        # junta o lote até AUDIT_BATCH_SIZE ou AUDIT_FLUSH_INTERVAL (o que vier primeiro)
+        while len(rows) < AUDIT_BATCH_SIZE and not _stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                rows.append(_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+            rows.extend(_drain(AUDIT_BATCH_SIZE - len(rows)))
+        _count("written", _write_rows(rows))
+        _count("batches")
+
+
+def start_audit_writer():
+    global _writer
+    if _writer is None or not _writer.is_alive():
+        with _writer_lock:
+            if _writer is None or not _writer.is_alive():
+                _stop.clear()
+                _writer = threading.Thread(target=_writer_loop, name="audit-writer", daemon=True)
+                _writer.start()
+    return _writer
+
+
+def stop_audit_writer(timeout: float = 10.0):
+    """Esvazia a fila e para a thread (chamado no shutdown da aplicação e na saída do processo)."""
+    _stop.set()
+    if _writer is not None:
+        _writer.join(timeout)
+    # sobrou algo (thread não iniciada ou timeout): grava direto
+    rows = _drain(AUDIT_QUEUE_SIZE)
+    while rows:
+        _count("written", _write_rows(rows))
+        _count("batches")
+        rows = _drain(AUDIT_QUEUE_SIZE)
+
+
+atexit.register(stop_audit_writer)
+
+
+def compute_changes(previous_data: dict, current_data: dict) -> dict:
+    """Só o que mudou: {campo: [antes, depois]} (criação: antes None; remoção: depois None)."""
+    previous_data = previous_data or {}
+    current_data = current_data or {}
+    changes = {}
+    for key in {**previous_data, **current_data}:
+        before, after = previous_data.get(key), current_data.get(key)
+        if before != after:
+            changes[key] = [before, after]
+    return changes
+
+
+def get_audit_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["queued"] = _queue.qsize()
+    return stats
+
 
 def log_action(
     action: str,
     previous_data: dict,
     current_data: dict,
     db: Session,
-    current_user: User
+    current_user: User,
+    entity: Optional[str] = None,
 ):
     """
-    Registra uma ação no banco de dados. current_user e db são obrigatórios.
+    Registra uma ação de auditoria (apenas os campos alterados). Não usa nem faz commit na sessão `db`
+    da requisição (mantido na assinatura por compatibilidade); o registro é gravado em lote pela thread de auditoria.
+    Com a fila cheia, espera até AUDIT_ENQUEUE_TIMEOUT e então grava direto (a fila cheia não descarta nada;
+    só um registro que o banco recusa é descartado, com o conteúdo no log).
     """
-    log_entry = ActionLog(
-        user_id=current_user.id,
-        action=action,
-        previous_data=previous_data,
-        current_data=current_data
-    )
+    row = {
+        "user_id": current_user.id,
+        "action": action,
+        "entity": entity,
+        "changes": compute_changes(previous_data, current_data),
+        "timestamp": datetime.now(),
+    }
+    start_audit_writer()
     try:
-        db.add(log_entry)
-        db.commit()
-    except Exception as e:
-        print(f"[LOG ERROR] {e}")
+        _queue.put(row, timeout=AUDIT_ENQUEUE_TIMEOUT)
+        _count("enqueued")
+    except queue.Full:
+        _count("direct_writes")
+        _count("written", _write_rows([row]))
@@ -1,6 +1,8 @@
 import os
 import hashlib
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import dropbox
 import requests
 from dotenv import load_dotenv
@@ -13,6 +15,10 @@ DROPBOX_REFRESH_TOKEN = os.environ.get('DROPBOX_REFRESH_TOKEN')
 DROPBOX_CLIENT_ID = os.environ.get('DROPBOX_CLIENT_ID')
 DROPBOX_CLIENT_SECRET = os.environ.get('DROPBOX_CLIENT_SECRET')
 
+# Upload em partes: tamanho de cada chunk e a partir de qual tamanho o modo é usado (bytes)
+DROPBOX_UPLOAD_CHUNK_SIZE = int(os.environ.get('DROPBOX_UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024))
+DROPBOX_UPLOAD_SESSION_THRESHOLD = int(os.environ.get('DROPBOX_UPLOAD_SESSION_THRESHOLD', 16 * 1024 * 1024))
+
 
 def generate_timestamp_hash():
     """Gera um hash único baseado no timestamp."""
@@ -21,7 +27,26 @@ def generate_timestamp_hash():
     return hash_object.hexdigest()[:16]  # Usa apenas os primeiros 16 caracteres
 
 
-def get_dropbox_access_token():
+# Margem (em segundos) antes do `expires_in` em que o token já é considerado vencido
+DROPBOX_TOKEN_REFRESH_MARGIN = int(os.environ.get('DROPBOX_TOKEN_REFRESH_MARGIN', 300))
+
+# Validade assumida (segundos) quando a resposta de renovação não traz `expires_in`
+DROPBOX_TOKEN_DEFAULT_TTL = int(os.environ.get('DROPBOX_TOKEN_DEFAULT_TTL', 14400))
+
+
+# Cache do access token compartilhado por todo o processo
+_token_lock = threading.Lock()
+_stats_lock = threading.Lock()  # separado: contar um hit não espera uma renovação em andamento
+_token_cache = {"access_token": None, "expires_at": 0.0, "client": None}
+_token_stats = {"hits": 0, "refreshes": 0, "errors": 0}
+
+
+def _count(key):
+    with _stats_lock:
+        _token_stats[key] += 1
+
+
+def _request_dropbox_access_token():
     """Obtém um novo access token usando o refresh token."""
     if not all([DROPBOX_REFRESH_TOKEN, DROPBOX_CLIENT_ID, DROPBOX_CLIENT_SECRET]):
         raise Exception("Variáveis de ambiente para token do Dropbox não estão configuradas corretamente.")
@@ -39,19 +64,87 @@ def get_dropbox_access_token():
     if response.status_code == 200:
         
         token_data = response.json()
-        return token_data["access_token"]
+        return token_data["access_token"], int(token_data.get("expires_in") or DROPBOX_TOKEN_DEFAULT_TTL)
     else:
         raise Exception(f"Erro ao obter access token: {response.text}")
 
 
+def _token_is_valid():
+    return _token_cache["access_token"] is not None and time.monotonic() < _token_cache["expires_at"]
+
+
+def get_dropbox_access_token(force_refresh=False):
+    """
+    Retorna o access token em cache, renovando-o apenas quando estiver perto de expirar.
+    Chamadas concorrentes aguardam uma única renovação em vez de cada uma pedir um token.
+    """
+    if not force_refresh and _token_is_valid():
+        _count("hits")
+        return _token_cache["access_token"]
+
+    with _token_lock:
+        # Outra thread pode ter renovado enquanto esperávamos o lock
+        if not force_refresh and _token_is_valid():
+            _count("hits")
+            return _token_cache["access_token"]
+
+        try:
+            access_token, expires_in = _request_dropbox_access_token()
+        except Exception:
+            _count("errors")
+            raise
+
+        ttl = max(expires_in - DROPBOX_TOKEN_REFRESH_MARGIN, 0)
+        _token_cache["access_token"] = access_token
+        _token_cache["expires_at"] = time.monotonic() + ttl
+        _count("refreshes")
+        return access_token
+
+
+def invalidate_dropbox_access_token():
+    """Descarta o token em cache (ex.: após um erro de autenticação do Dropbox)."""
+    with _token_lock:
+        _token_cache["access_token"] = None
+        _token_cache["expires_at"] = 0.0
+        _token_cache["client"] = None
+
+
+def get_token_cache_stats():
+    """Contadores de uso do cache de token (hits x renovações)."""
+    remaining = max(_token_cache["expires_at"] - time.monotonic(), 0) if _token_cache["access_token"] else 0
+    with _stats_lock:
+        stats = dict(_token_stats)
+    return {**stats, "expires_in": int(remaining)}
+
+
 def init_client_dbp():
-    # Inicializar cliente Dropbox
-   return dropbox.Dropbox(get_dropbox_access_token())
+    # Inicializar cliente Dropbox (reaproveitado enquanto o token em cache for válido)
+    access_token = get_dropbox_access_token()
+    cached = _token_cache["client"]
+    if cached is None or cached[0] != access_token:
+        cached = (access_token, dropbox.Dropbox(access_token))
+        _token_cache["client"] = cached
+    return cached[1]
+
+
+def _call_with_client(operation):
+    """
+    Executa `operation(dbx)`; se o Dropbox recusar o token (revogado ou expirado antes do previsto),
+    descarta o cache e tenta uma única vez com um token novo.
+    """
+    try:
+        return operation(init_client_dbp())
+    except dropbox.exceptions.AuthError:
+        invalidate_dropbox_access_token()
+        return operation(init_client_dbp())
 
 
 def get_shared_link(file_path):
     """Obtém ou cria um link compartilhável para um arquivo."""
-    dbx = init_client_dbp()
+    return _call_with_client(lambda dbx: _get_shared_link(dbx, file_path))
+
+
+def _get_shared_link(dbx, file_path):
     try:
         link_metadata = dbx.sharing_create_shared_link_with_settings(file_path)
         shared_url = link_metadata.url
@@ -71,7 +164,10 @@ def get_shared_link(file_path):
 
 def create_folder_if_not_exists(folder_path):
     """Cria uma pasta no Dropbox apenas se ela não existir."""
-    dbx = init_client_dbp()
+    _call_with_client(lambda dbx: _create_folder(dbx, folder_path))
+
+
+def _create_folder(dbx, folder_path):
     try:
         dbx.files_create_folder_v2(folder_path)
     except dropbox.exceptions.ApiError as e:
@@ -81,51 +177,97 @@ def create_folder_if_not_exists(folder_path):
             raise
 
 
-def create_new_folder(folder_name=None):
-    """Cria uma nova pasta no Dropbox e retorna o caminho da pasta."""
-    try:
-        folder_hash = folder_name if folder_name else generate_timestamp_hash()
-        dropbox_folder = f"/uploads/{folder_hash}"
-        create_folder_if_not_exists(dropbox_folder)
-        return {"folder": folder_hash, "path": dropbox_folder}
-    except Exception as e:
-        raise Exception(f"Erro ao criar pasta: {str(e)}")
+# Tamanho do bloco usado pelo algoritmo de content hash do Dropbox
+DROPBOX_HASH_BLOCK_SIZE = 4 * 1024 * 1024
 
 
-def upload_files_to_dropbox(files, folder_name=None):
-    """Faz upload de múltiplos arquivos para o Dropbox e retorna os links compartilháveis."""
-    dbx = init_client_dbp()
-    try:
-        # Se um diretório não for fornecido, gera um novo
-        folder_hash = folder_name if folder_name else generate_timestamp_hash()
-        dropbox_folder = f"/uploads/{folder_hash}"
-        
-        # Criar a pasta se não existir
-        create_folder_if_not_exists(dropbox_folder)
-        
-        uploaded_files = {}
-        for file_name, file_content in files.items():
-            dropbox_path = f"{dropbox_folder}/{file_name}"
-            dbx.files_upload(file_content, dropbox_path, mode=dropbox.files.WriteMode.overwrite)
-            uploaded_files[file_name] = get_shared_link(dropbox_path)
-        
-        return folder_hash, uploaded_files
-    except Exception as e:
-        raise Exception(f"Erro ao fazer upload: {str(e)}")
+def compute_content_hash(file_content):
+    """
+    Calcula o content hash no formato do Dropbox (SHA-256 dos SHA-256 de cada bloco de 4 MB).
+    Aceita bytes ou um arquivo aberto, que é lido em blocos e volta ao início ao final.
+    """
+    block_hashes = hashlib.sha256()
+    if isinstance(file_content, (bytes, bytearray)):
+        for start in range(0, len(file_content), DROPBOX_HASH_BLOCK_SIZE):
+            block_hashes.update(hashlib.sha256(file_content[start:start + DROPBOX_HASH_BLOCK_SIZE]).digest())
+        return block_hashes.hexdigest()
 
+    file_content.seek(0)
+    while True:
+        block = file_content.read(DROPBOX_HASH_BLOCK_SIZE)
+        if not block:
+            break
+        block_hashes.update(hashlib.sha256(block).digest())
+    file_content.seek(0)
+    return block_hashes.hexdigest()
 
-def list_files_in_folder(folder_hash):
-    """Lista os arquivos em uma pasta no Dropbox e retorna links diretos."""
-    dbx = init_client_dbp()
-    try:
-        dropbox_folder = f"/uploads/{folder_hash}"
-        response = dbx.files_list_folder(dropbox_folder)
-        file_links = {}
-        
-        for entry in response.entries:
-            if isinstance(entry, dropbox.files.FileMetadata):
-                file_links[entry.name] = get_shared_link(entry.path_lower)
-        
-        return file_links
-    except dropbox.exceptions.ApiError as e:
-        raise Exception(f"Erro ao listar arquivos: {str(e)}")
+
+def _file_size(fileobj):
+    """Tamanho de um arquivo aberto, sem alterar a posição de leitura."""
+    position = fileobj.tell()
+    fileobj.seek(0, os.SEEK_END)
+    size = fileobj.tell()
+    fileobj.seek(position)
+    return size
+
+
+def _upload_in_chunks(dbx, fileobj, dropbox_path, size):
+    """Envia um arquivo grande em partes (upload session), mantendo só um chunk em memória."""
+    chunk = fileobj.read(DROPBOX_UPLOAD_CHUNK_SIZE)
+    session = dbx.files_upload_session_start(chunk)
+    cursor = dropbox.files.UploadSessionCursor(session_id=session.session_id, offset=len(chunk))
+    commit = dropbox.files.CommitInfo(path=dropbox_path, mode=dropbox.files.WriteMode.overwrite)
+
+    while size - cursor.offset > DROPBOX_UPLOAD_CHUNK_SIZE:
+        chunk = fileobj.read(DROPBOX_UPLOAD_CHUNK_SIZE)
+        dbx.files_upload_session_append_v2(chunk, cursor)
+        cursor.offset += len(chunk)
+
+    dbx.files_upload_session_finish(fileobj.read(DROPBOX_UPLOAD_CHUNK_SIZE), cursor, commit)
+
+
+def upload_content(dropbox_path, file_content):
+    """
+    Envia um arquivo para o Dropbox. Aceita bytes ou um arquivo aberto (ex.: `UploadFile.file`);
+    arquivos acima de DROPBOX_UPLOAD_SESSION_THRESHOLD são enviados em partes.
+    """
+    _call_with_client(lambda dbx: _upload(dbx, dropbox_path, file_content))
+
+
+def _upload(dbx, dropbox_path, file_content):
+    if isinstance(file_content, (bytes, bytearray)):
+        dbx.files_upload(file_content, dropbox_path, mode=dropbox.files.WriteMode.overwrite)
+        return
+
+    file_content.seek(0)
+    size = _file_size(file_content)
+    if size > DROPBOX_UPLOAD_SESSION_THRESHOLD:
+        _upload_in_chunks(dbx, file_content, dropbox_path, size)
+    else:
+        dbx.files_upload(file_content.read(), dropbox_path, mode=dropbox.files.WriteMode.overwrite)
+
+
+def get_shared_links(file_paths, max_concurrency):
+    """
+    Resolve os links compartilháveis de vários arquivos em paralelo (no máximo `max_concurrency`
+    chamadas ao mesmo tempo; o limite vem de UPLOAD_CONCURRENCY no storage_service). Retorna {caminho: link}.
+    """
+    if not file_paths:
+        return {}
+    workers = max(1, min(max_concurrency, len(file_paths)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(zip(file_paths, pool.map(get_shared_link, file_paths)))
+
+
+def list_folder_files(folder_path):
+    """Lista todos os arquivos de uma pasta no Dropbox, seguindo o cursor de paginação. Retorna [(nome, caminho)]."""
+    return _call_with_client(lambda dbx: _list_folder(dbx, folder_path))
+
+
+def _list_folder(dbx, folder_path):
+    response = dbx.files_list_folder(folder_path)
+    entries = list(response.entries)
+    while response.has_more:
+        response = dbx.files_list_folder_continue(response.cursor)
+        entries.extend(response.entries)
+    return [(entry.name, entry.path_lower) for entry in entries if isinstance(entry, dropbox.files.FileMetadata)]
@@ -0,0 +1,136 @@
+import io
+import os
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow é opcional: sem ele as imagens são enviadas sem alteração
+    Image = None
+    ImageOps = None
+
+load_dotenv(override=True)
+
+
+def _env_flag(name, default="false"):
+    return os.environ.get(name, default).strip().lower() in ("1", "true", "yes", "sim")
+
+
+# Redimensiona e recodifica fotos antes do upload
+IMAGE_PIPELINE_ENABLED = _env_flag('IMAGE_PIPELINE_ENABLED')
+# Maior lado da imagem processada (pixels)
+IMAGE_MAX_SIZE = int(os.environ.get('IMAGE_MAX_SIZE', 1920))
+# Qualidade do JPEG gerado (1-95)
+IMAGE_JPEG_QUALITY = int(os.environ.get('IMAGE_JPEG_QUALITY', 82))
+# Mantém também o arquivo original, em `<pasta>/originals/`
+IMAGE_KEEP_ORIGINAL = _env_flag('IMAGE_KEEP_ORIGINAL')
+# Processos dedicados ao processamento de imagens
+IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', max((os.cpu_count() or 2) // 2, 1)))
+# Arquivos maiores que isso (bytes) não são processados
+IMAGE_MAX_INPUT_BYTES = int(os.environ.get('IMAGE_MAX_INPUT_BYTES', 50 * 1024 * 1024))
+
+_IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".bmp", ".tif", ".tiff"}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # "spawn" evita herdar locks das threads do servidor ao criar os processos
+                _pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS,
+                                            mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def _downscale(data, max_size, quality):
+    """Executado no pool de processos: corrige a orientação, reduz, remove metadados e gera JPEG."""
+    with Image.open(io.BytesIO(data)) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.mode in ("RGBA", "LA", "P"):
+            img = img.convert("RGBA")
+            background = Image.new("RGB", img.size, (255, 255, 255))
+            background.paste(img, mask=img.getchannel("A"))
+            img = background
+        elif img.mode != "RGB":
+            img = img.convert("RGB")
+        img.thumbnail((max_size, max_size), Image.LANCZOS)
+
+        out = io.BytesIO()
+        # sem `exif=`/`icc_profile=` os metadados da câmera não são copiados
+        img.save(out, format="JPEG", quality=quality, optimize=True, progressive=True)
+        return out.getvalue()
+
+
+def _is_image(file_name):
+    return os.path.splitext(file_name)[1].lower() in _IMAGE_EXTENSIONS
+
+
+def _size(file_content):
+    if isinstance(file_content, (bytes, bytearray)):
+        return len(file_content)
+    file_content.seek(0, 2)
+    size = file_content.tell()
+    file_content.seek(0)
+    return size
+
+
+def _read(file_content):
+    if isinstance(file_content, (bytes, bytearray)):
+        return bytes(file_content)
+    file_content.seek(0)
+    data = file_content.read()
+    file_content.seek(0)
+    return data
+
+
+def _process_one(file_name, file_content):
+    # confere o tamanho antes de ler: arquivos grandes continuam só no disco (spool) e vão como original
+    if _size(file_content) > IMAGE_MAX_INPUT_BYTES:
+        return None
+    data = _read(file_content)
+    try:
+        return _get_pool().submit(_downscale, data, IMAGE_MAX_SIZE, IMAGE_JPEG_QUALITY).result()
+    except Exception as e:
+        print(f"[LOG ERROR] imagem {file_name}: {e}")  # formato não suportado: envia o original
+        return None
+
+
+def prepare_images(files: dict):
+    """
+    Processa as fotos de `files` ({nome: bytes ou arquivo aberto}) quando IMAGE_PIPELINE_ENABLED.
+    Retorna ({nome original: (nome final, conteúdo)}, {caminho do original: conteúdo}); o segundo
+    dict só é preenchido com IMAGE_KEEP_ORIGINAL.
+    """
+    prepared = {file_name: (file_name, content) for file_name, content in files.items()}
+    originals = {}
+    if not IMAGE_PIPELINE_ENABLED or Image is None:
+        return prepared, originals
+
+    images = [file_name for file_name in files if _is_image(file_name)]
+    if not images:
+        return prepared, originals
+
+    # Poucas imagens lidas por vez: o consumo de memória fica limitado ao número de processos
+    with ThreadPoolExecutor(max_workers=IMAGE_WORKERS) as pool:
+        processed = dict(zip(images, pool.map(lambda name: _process_one(name, files[name]), images)))
+
+    used_names = set(files)
+    for file_name, data in processed.items():
+        if data is None:
+            continue
+        final_name = os.path.splitext(file_name)[0] + ".jpg"
+        if final_name != file_name and final_name in used_names:
+            final_name = file_name + ".jpg"
+        used_names.add(final_name)
+        prepared[file_name] = (final_name, data)
+        if IMAGE_KEEP_ORIGINAL:
+            originals[f"originals/{file_name}"] = files[file_name]
+
+    return prepared, originals
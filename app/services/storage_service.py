@@ -0,0 +1,275 @@
+import os
+import random
+import shutil
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Tuple
+
+from dotenv import load_dotenv
+
+from app.services import dropbox_service
+from app.services.dropbox_service import generate_timestamp_hash
+
+load_dotenv(override=True)
+
+
+# Backend de armazenamento: "dropbox" (padrão), "local" ou "memory"
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'dropbox').strip().lower()
+
+# Quantidade máxima de chamadas simultâneas ao armazenamento em operações em lote (uploads e links)
+UPLOAD_CONCURRENCY = int(os.environ.get('UPLOAD_CONCURRENCY', 4))
+
+# Backend local: diretório raiz e URL base dos links gerados
+LOCAL_STORAGE_DIR = os.environ.get('LOCAL_STORAGE_DIR', 'storage')
+LOCAL_STORAGE_BASE_URL = os.environ.get('LOCAL_STORAGE_BASE_URL', '/files')
+
+# Backend em memória: latência simulada por operação (milissegundos)
+MEMORY_STORAGE_LATENCY_MS = float(os.environ.get('MEMORY_STORAGE_LATENCY_MS', 0))
+MEMORY_STORAGE_JITTER_MS = float(os.environ.get('MEMORY_STORAGE_JITTER_MS', 0))
+# Guarda o conteúdo dos arquivos (por padrão só o tamanho, para a memória não crescer durante o teste de carga)
+MEMORY_STORAGE_KEEP_CONTENT = os.environ.get('MEMORY_STORAGE_KEEP_CONTENT', 'false').strip().lower() in ('1', 'true', 'yes', 'sim')
+
+_COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class StorageBackend(ABC):
+    """Operações de armazenamento usadas pelas rotas de upload. Caminhos no formato `/uploads/<pasta>/<arquivo>`."""
+
+    name = "base"
+
+    @abstractmethod
+    def create_folder(self, folder_path: str) -> None:
+        ...
+
+    @abstractmethod
+    def upload(self, file_path: str, file_content) -> None:
+        """Grava um arquivo (bytes ou arquivo aberto), sobrescrevendo se já existir."""
+
+    @abstractmethod
+    def list_folder(self, folder_path: str) -> List[Tuple[str, str]]:
+        """Arquivos da pasta como [(nome, caminho)]."""
+
+    @abstractmethod
+    def get_link(self, file_path: str) -> str:
+        ...
+
+    def get_links(self, file_paths: List[str]) -> Dict[str, str]:
+        return {path: self.get_link(path) for path in file_paths}
+
+
+class DropboxStorage(StorageBackend):
+    name = "dropbox"
+
+    def create_folder(self, folder_path):
+        dropbox_service.create_folder_if_not_exists(folder_path)
+
+    def upload(self, file_path, file_content):
+        dropbox_service.upload_content(file_path, file_content)
+
+    def list_folder(self, folder_path):
+        return dropbox_service.list_folder_files(folder_path)
+
+    def get_link(self, file_path):
+        return dropbox_service.get_shared_link(file_path)
+
+    def get_links(self, file_paths):
+        return dropbox_service.get_shared_links(file_paths, UPLOAD_CONCURRENCY)
+
+
+class LocalStorage(StorageBackend):
+    """Grava os arquivos em disco; os links apontam para LOCAL_STORAGE_BASE_URL."""
+
+    name = "local"
+
+    def __init__(self, root_dir=LOCAL_STORAGE_DIR, base_url=LOCAL_STORAGE_BASE_URL):
+        self.root_dir = os.path.abspath(root_dir)
+        self.base_url = base_url.rstrip("/")
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def _full_path(self, path):
+        full_path = os.path.abspath(os.path.join(self.root_dir, path.lstrip("/")))
+        if os.path.commonpath([self.root_dir, full_path]) != self.root_dir:
+            raise Exception(f"Caminho inválido: {path}")
+        return full_path
+
+    def create_folder(self, folder_path):
+        os.makedirs(self._full_path(folder_path), exist_ok=True)
+
+    def upload(self, file_path, file_content):
+        full_path = self._full_path(file_path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "wb") as out:
+            if isinstance(file_content, (bytes, bytearray)):
+                out.write(file_content)
+            else:
+                file_content.seek(0)
+                shutil.copyfileobj(file_content, out, _COPY_CHUNK_SIZE)
+
+    def list_folder(self, folder_path):
+        full_path = self._full_path(folder_path)
+        if not os.path.isdir(full_path):
+            raise Exception(f"Pasta não encontrada: {folder_path}")
+        return [
+            (name, f"{folder_path.rstrip('/')}/{name}")
+            for name in sorted(os.listdir(full_path))
+            if os.path.isfile(os.path.join(full_path, name))
+        ]
+
+    def get_link(self, file_path):
+        self._full_path(file_path)
+        return f"{self.base_url}/{file_path.lstrip('/')}"
+
+
+class MemoryStorage(StorageBackend):
+    """
+    Simula o serviço remoto em testes de carga, com latência opcional. Registra cada arquivo com o seu
+    tamanho; o conteúdo só é guardado com `keep_content` (MEMORY_STORAGE_KEEP_CONTENT).
+    """
+
+    name = "memory"
+
+    def __init__(self, latency_ms=MEMORY_STORAGE_LATENCY_MS, jitter_ms=MEMORY_STORAGE_JITTER_MS,
+                 keep_content=MEMORY_STORAGE_KEEP_CONTENT):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.keep_content = keep_content
+        self._files = {}  # caminho -> bytes (keep_content) ou tamanho
+        self._folders = set()
+        self._lock = threading.Lock()
+
+    def _delay(self):
+        delay_ms = self.latency_ms + (random.uniform(0, self.jitter_ms) if self.jitter_ms else 0)
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000)
+
+    def create_folder(self, folder_path):
+        self._delay()
+        with self._lock:
+            self._folders.add(folder_path.rstrip("/"))
+
+    def upload(self, file_path, file_content):
+        if isinstance(file_content, (bytes, bytearray)):
+            stored = bytes(file_content) if self.keep_content else len(file_content)
+        else:
+            # lê em partes como um envio real, sem manter o arquivo inteiro em memória
+            file_content.seek(0)
+            chunks, size = [], 0
+            for chunk in iter(lambda: file_content.read(_COPY_CHUNK_SIZE), b""):
+                size += len(chunk)
+                if self.keep_content:
+                    chunks.append(chunk)
+            stored = b"".join(chunks) if self.keep_content else size
+        self._delay()
+        with self._lock:
+            self._files[file_path] = stored
+            self._folders.add(file_path.rsplit("/", 1)[0])
+
+    def list_folder(self, folder_path):
+        self._delay()
+        prefix = folder_path.rstrip("/") + "/"
+        with self._lock:
+            if folder_path.rstrip("/") not in self._folders:
+                raise Exception(f"Pasta não encontrada: {folder_path}")
+            return [(path[len(prefix):], path) for path in sorted(self._files)
+                    if path.startswith(prefix) and "/" not in path[len(prefix):]]
+
+    def get_link(self, file_path):
+        self._delay()
+        return f"memory://{file_path.lstrip('/')}"
+
+
+_BACKENDS = {
+    "dropbox": DropboxStorage,
+    "local": LocalStorage,
+    "memory": MemoryStorage,
+}
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage() -> StorageBackend:
+    """Retorna o backend configurado em STORAGE_BACKEND (instância única por processo)."""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                if STORAGE_BACKEND not in _BACKENDS:
+                    raise Exception(f"STORAGE_BACKEND inválido: {STORAGE_BACKEND}")
+                _storage = _BACKENDS[STORAGE_BACKEND]()
+    return _storage
+
+
+def _folder_path(folder_hash):
+    return f"/uploads/{folder_hash}"
+
+
+def create_new_folder(folder_name=None):
+    """Cria uma nova pasta no armazenamento e retorna o caminho da pasta."""
+    try:
+        folder_hash = folder_name if folder_name else generate_timestamp_hash()
+        folder_path = _folder_path(folder_hash)
+        get_storage().create_folder(folder_path)
+        return {"folder": folder_hash, "path": folder_path}
+    except Exception as e:
+        raise Exception(f"Erro ao criar pasta: {str(e)}")
+
+
+def _upload_file(file_path, file_content):
+    """Envia um único arquivo e retorna o seu link."""
+    storage = get_storage()
+    storage.upload(file_path, file_content)
+    return storage.get_link(file_path)
+
+
+def upload_files(files, folder_name=None, max_concurrency=None, on_result=None):
+    """
+    Faz upload de múltiplos arquivos em paralelo (no máximo `max_concurrency` ao mesmo tempo)
+    e retorna o resultado individual de cada arquivo, na mesma ordem recebida.
+    `on_result`, se informado, é chamado com o resultado de cada arquivo assim que ele termina.
+    """
+    # Se um diretório não for fornecido, gera um novo
+    folder_hash = folder_name if folder_name else generate_timestamp_hash()
+    folder_path = _folder_path(folder_hash)
+
+    # Criar a pasta se não existir
+    get_storage().create_folder(folder_path)
+
+    workers = max(1, min(max_concurrency or UPLOAD_CONCURRENCY, len(files) or 1))
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(_upload_file, f"{folder_path}/{file_name}", file_content): file_name
+            for file_name, file_content in files.items()
+        }
+        for future in as_completed(futures):
+            file_name = futures[future]
+            try:
+                result = {"file_name": file_name, "status": "ok", "file_url": future.result()}
+            except Exception as e:
+                result = {"file_name": file_name, "status": "error", "error": str(e)}
+            results[file_name] = result
+            if on_result:
+                on_result(result)
+
+    return folder_hash, [results[file_name] for file_name in files]
+
+
+def list_files_in_folder(folder_hash, known_files=None):
+    """
+    Lista os arquivos de uma pasta no armazenamento e retorna links diretos.
+    Só resolve links dos arquivos fora de `known_files`.
+    """
+    known_files = known_files or {}
+    storage = get_storage()
+    try:
+        missing = {
+            path: name
+            for name, path in storage.list_folder(_folder_path(folder_hash))
+            if name not in known_files
+        }
+        links = storage.get_links(list(missing))
+        return {missing[path]: url for path, url in links.items()}
+    except Exception as e:
+        raise Exception(f"Erro ao listar arquivos: {str(e)}")
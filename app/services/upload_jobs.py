@@ -0,0 +1,137 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import datetime
+from typing import Optional
+
+from app.db.session import SessionLocal
+from app.services.upload_service import store_files
+
+
+# Diretório onde os arquivos ficam até serem enviados ao Dropbox
+UPLOAD_STAGING_DIR = os.environ.get('UPLOAD_STAGING_DIR', os.path.join(tempfile.gettempdir(), 'gmf_uploads'))
+# Jobs processados ao mesmo tempo por processo
+UPLOAD_JOB_WORKERS = int(os.environ.get('UPLOAD_JOB_WORKERS', 2))
+# Por quanto tempo (segundos) o status de um job finalizado continua disponível
+UPLOAD_JOB_TTL = int(os.environ.get('UPLOAD_JOB_TTL', 3600))
+
+_COPY_CHUNK_SIZE = 1024 * 1024
+
+# Os jobs ficam em memória: o status deve ser consultado no mesmo processo que recebeu o upload
+_jobs = {}
+_jobs_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=UPLOAD_JOB_WORKERS, thread_name_prefix="upload-job")
+
+
+def _purge_finished_jobs():
+    limit = time.time() - UPLOAD_JOB_TTL
+    with _jobs_lock:
+        for job_id in [j for j, job in _jobs.items() if job["finished_at"] and job["finished_at"] < limit]:
+            del _jobs[job_id]
+
+
+def _set_file_status(job_id, file_name, status, **extra):
+    with _jobs_lock:
+        for entry in _jobs[job_id]["files"]:
+            if entry["file_name"] == file_name:
+                entry.update(status=status, **extra)
+
+
+def submit_upload_job(
+    files,
+    folder_name: Optional[str] = None,
+    user_id: Optional[int] = None,
+    checklist_id: Optional[int] = None,
+) -> dict:
+    """
+    Copia os arquivos para o diretório de staging e agenda o envio em segundo plano.
+    `files` é uma lista de (nome, arquivo aberto). Retorna o job recém-criado.
+    """
+    _purge_finished_jobs()
+
+    job_id = uuid.uuid4().hex
+    job_dir = os.path.join(UPLOAD_STAGING_DIR, job_id)
+    os.makedirs(job_dir, exist_ok=True)
+
+    staged = []
+    for index, (file_name, fileobj) in enumerate(files):
+        staged_path = os.path.join(job_dir, str(index))  # nome interno evita colisão/path traversal
+        fileobj.seek(0)
+        with open(staged_path, "wb") as out:
+            shutil.copyfileobj(fileobj, out, _COPY_CHUNK_SIZE)
+        staged.append((file_name, staged_path))
+
+    job = {
+        "job_id": job_id,
+        "status": "queued",
+        "user_id": user_id,
+        "checklist": checklist_id,
+        "folder": folder_name,
+        "files": [{"file_name": file_name, "status": "pending"} for file_name, _ in staged],
+        "errors": [],
+        "created_in": datetime.now().isoformat(),
+        "finished_at": None,
+    }
+    with _jobs_lock:
+        _jobs[job_id] = job
+
+    _executor.submit(_run_job, job_id, job_dir, staged, folder_name, user_id, checklist_id)
+    return get_upload_job(job_id)
+
+
+def _run_job(job_id, job_dir, staged, folder_name, user_id, checklist_id):
+    with _jobs_lock:
+        _jobs[job_id]["status"] = "running"
+
+    db = SessionLocal()
+    try:
+        with ExitStack() as stack:
+            files = {file_name: stack.enter_context(open(path, "rb")) for file_name, path in staged}
+            result = store_files(
+                db=db,
+                files=files,
+                folder_name=folder_name,
+                user_id=user_id,
+                checklist_id=checklist_id,
+                on_progress=lambda file_name, status: _set_file_status(job_id, file_name, status),
+            )
+
+        for saved in result["files"]:
+            _set_file_status(job_id, saved.get("original_name", saved["file_name"]),
+                             "deduplicated" if saved.get("deduplicated") else "done",
+                             upload_file=saved["upload_file"], file_url=saved["file_url"])
+        for error in result["errors"]:
+            _set_file_status(job_id, error["file_name"], "error", error=error["error"])
+
+        with _jobs_lock:
+            job = _jobs[job_id]
+            job["folder"] = result["folder"]
+            job["errors"] = result["errors"]
+            job["status"] = "failed" if not result["files"] else ("partial" if result["errors"] else "done")
+    except Exception as e:
+        with _jobs_lock:
+            _jobs[job_id]["status"] = "failed"
+            _jobs[job_id]["errors"] = [{"file_name": None, "error": str(e)}]
+            # arquivos sem estado final ("uploaded" ainda não foi registrado no banco) passam a "error"
+            for entry in _jobs[job_id]["files"]:
+                if entry["status"] in ("pending", "uploaded"):
+                    entry.update(status="error", error=str(e))
+    finally:
+        db.close()
+        shutil.rmtree(job_dir, ignore_errors=True)
+        with _jobs_lock:
+            _jobs[job_id]["finished_at"] = time.time()
+
+
+def get_upload_job(job_id: str) -> Optional[dict]:
+    """Retorna uma cópia do status do job (ou None se não existir)."""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return None
+        return {**job, "files": [dict(f) for f in job["files"]], "errors": list(job["errors"])}
@@ -0,0 +1,99 @@
+from typing import Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from app.db.crud import save_upload, get_upload_files_by_hashes
+from app.services.dropbox_service import compute_content_hash
+from app.services.storage_service import upload_files
+from app.services.image_service import prepare_images
+
+
+def store_files(
+    db: Session,
+    files: dict,
+    folder_name: Optional[str] = None,
+    user_id: Optional[int] = None,
+    checklist_id: Optional[int] = None,
+    on_progress: Optional[Callable[[str, str], None]] = None,
+):
+    """
+    Envia arquivos para o armazenamento configurado e registra os metadados no banco.
+    Arquivos cujo content hash já existe não são reenviados: a linha existente é devolvida.
+    `files` é um dict {nome: bytes ou arquivo aberto}; `on_progress(nome, status)` recebe
+    o andamento de cada arquivo ("deduplicated", "uploaded" ou "error").
+    """
+    hashes = {file_name: compute_content_hash(content) for file_name, content in files.items()}
+    existing = get_upload_files_by_hashes(db, hashes.values())
+
+    # Só envia uma vez cada conteúdo novo (inclusive repetidos dentro do mesmo lote)
+    to_upload, repeated = {}, {}
+    first_by_hash = {}
+    for file_name, content in files.items():
+        content_hash = hashes[file_name]
+        if content_hash in existing:
+            if on_progress:
+                on_progress(file_name, "deduplicated")
+            continue
+        if content_hash in first_by_hash:
+            repeated[file_name] = first_by_hash[content_hash]
+            continue
+        first_by_hash[content_hash] = file_name
+        to_upload[file_name] = content
+
+    folder, saved, errors = folder_name, [], []
+    stored_name = {}
+    if to_upload:
+        # Fotos podem ser reduzidas/recodificadas (e renomeadas para .jpg) antes do envio
+        prepared, originals = prepare_images(to_upload)
+        stored_name = {file_name: final_name for file_name, (final_name, _) in prepared.items()}
+        source_name = {final_name: file_name for file_name, final_name in stored_name.items()}
+
+        def _on_result(result):
+            if on_progress and result["file_name"] in source_name:
+                on_progress(source_name[result["file_name"]], "uploaded" if result["status"] == "ok" else "error")
+
+        upload_map = {final_name: content for final_name, content in prepared.values()}
+        upload_map.update(originals)
+        folder, results = upload_files(upload_map, folder_name, on_result=_on_result)
+
+        uploaded_files = {r["file_name"]: r["file_url"] for r in results
+                          if r["status"] == "ok" and r["file_name"] in source_name}
+        errors = [{"file_name": source_name.get(r["file_name"], r["file_name"]), "error": r["error"]}
+                  for r in results if r["status"] == "error"]
+        if uploaded_files:
+            saved = save_upload(
+                db=db,
+                folder_hash=folder,
+                files=uploaded_files,
+                user_id=user_id,
+                checklist_id=checklist_id,
+                content_hashes={stored_name[file_name]: hashes[file_name] for file_name in to_upload},
+            )["files"]
+
+    saved_by_name = {f["file_name"]: f for f in saved}
+
+    def _entry(file_name, entry, **extra):
+        entry = {**entry, **extra}
+        if entry["file_name"] != file_name:
+            entry["original_name"] = file_name  # nome recebido, quando difere do armazenado
+        return entry
+
+    out = []
+    for file_name in files:
+        content_hash = hashes[file_name]
+        if content_hash in existing:
+            row = existing[content_hash]
+            out.append(_entry(file_name, {"upload_file": row.id, "file_name": row.file_name,
+                                          "file_url": row.file_url}, deduplicated=True))
+            continue
+        source = repeated.get(file_name, file_name)
+        entry = saved_by_name.get(stored_name.get(source))
+        if entry:
+            out.append(_entry(file_name, entry, **({"deduplicated": True} if source != file_name else {})))
+        elif source != file_name:
+            # repetido de um arquivo cujo envio falhou: registra o erro também para ele
+            errors.append({"file_name": file_name, "error": f"Falha no envio de {source} (mesmo conteúdo)."})
+            if on_progress:
+                on_progress(file_name, "error")
+
+    return {"folder": folder, "files": out, "errors": errors}
@@ -0,0 +1,32 @@
+"""
+Micro-benchmark do custo de autenticação por requisição: `jwt.decode` completo x `decode_token`
+(cache de tokens verificados). Uso: python -m app.test.bench_auth [iterações]
+"""
+import sys
+import time
+
+from jose import jwt
+
+from app.core.security import SECRET_KEY, ALGORITHM, create_access_token, decode_token
+
+
+def _bench(label, fn, iterations):
+    fn()  # aquecimento
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    per_call_us = (time.perf_counter() - started) / iterations * 1_000_000
+    print(f"{label:<32} {per_call_us:10.2f} µs/req")
+    return per_call_us
+
+
+def run(iterations=20000):
+    token = create_access_token({"sub": "1"})
+    print(f"⏱  {iterations} decodificações do mesmo token")
+    before = _bench("jwt.decode (sem cache)", lambda: jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]), iterations)
+    after = _bench("decode_token (com cache)", lambda: decode_token(token), iterations)
+    print(f"{'ganho':<32} {before / after:10.1f} x")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
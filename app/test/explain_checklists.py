@@ -0,0 +1,130 @@
+"""
+Confere, via EXPLAIN, se cada combinação de filtros da listagem de checklists usa o índice esperado.
+Insere uma massa realista, roda ANALYZE e desfaz tudo no final (rollback); rode em um banco de
+desenvolvimento já migrado. Uso: python -m app.test.explain_checklists
+"""
+import json
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from app.db.crud import checklist_filters, CHECKLIST_ORDER
+from app.db.models import Checklist
+from app.db.pagination import paginate, encode_cursor
+from app.db.session import SessionLocal
+
+SEED_CHECKLISTS = 100_000
+SEED_USERS = 500
+SEED_CLIENTS = 200
+
+# filtros -> índice que o planner deve escolher (version_bus não tem índice: é filtro residual)
+CASES = {
+    "meus checklists": (dict(user=True), "ix_checklists_user_created"),
+    "meus abertos": (dict(user=True, statuses=["INICIADO", "EM_TRANSPORTE", "ENTREGUE"]), "ix_checklists_user_created"),
+    "meus no período": (dict(user=True, days=30), "ix_checklists_user_created"),
+    "cliente": (dict(client=True), "ix_checklists_client_status_start"),
+    "cliente + status + semana": (dict(client=True, statuses=["EM_TRANSPORTE"], days=7), "ix_checklists_client_status_start"),
+    "status": (dict(statuses=["EM_TRANSPORTE"]), "ix_checklists_status_start"),
+    "status + semana": (dict(statuses=["EM_TRANSPORTE"], days=7), "ix_checklists_status_start"),
+    "todos (admin)": (dict(), "ix_checklists_created"),
+}
+
+
+def _seed(conn):
+    """
+    Massa parecida com produção: ~2 anos de checklists (um a cada 10 min), quase todos CONCLUIDO
+    e poucos em andamento. Tudo é desfeito no rollback ao final (inclusive as estatísticas do ANALYZE).
+    """
+    conn.execute(text(
+        "INSERT INTO users (name, mail, num_cnh, hashed_password, is_admin, status, token_version, created_in) "
+        "SELECT 'explain ' || g, 'explain-seed-' || g || '@example.invalid', 'explain-seed-' || g, '', false, true, 0, now() "
+        "FROM generate_series(1, :n) g"
+    ), {"n": SEED_USERS})
+    conn.execute(text(
+        "INSERT INTO clients (name, status, frequency_order, created_in) "
+        "SELECT 'explain-seed-' || g, true, 0, now() FROM generate_series(1, :n) g"
+    ), {"n": SEED_CLIENTS})
+    conn.execute(text("""
+        WITH u AS (SELECT array_agg(id) AS ids FROM users WHERE mail LIKE 'explain-seed-%'),
+             c AS (SELECT array_agg(id) AS ids FROM clients WHERE name LIKE 'explain-seed-%')
+        INSERT INTO checklists (fk_cliente, fk_user, status, date_start, date_end, created_in)
+        SELECT c.ids[1 + g % array_length(c.ids, 1)],
+               u.ids[1 + (g * 7) % array_length(u.ids, 1)],
+               CASE WHEN g % 1000 < 970 THEN 'CONCLUIDO'
+                    WHEN g % 1000 < 980 THEN 'INICIADO'
+                    WHEN g % 1000 < 985 THEN 'EM_TRANSPORTE'
+                    ELSE 'ENTREGUE' END,
+               now() - g * interval '10 minutes',
+               now() - g * interval '10 minutes',
+               now() - g * interval '10 minutes'
+          FROM generate_series(1, :n) g, u, c
+    """), {"n": SEED_CHECKLISTS})
+    conn.execute(text("ANALYZE users"))
+    conn.execute(text("ANALYZE clients"))
+    conn.execute(text("ANALYZE checklists"))
+    user_id = conn.execute(text("SELECT min(id) FROM users WHERE mail LIKE 'explain-seed-%'")).scalar()
+    client_id = conn.execute(text("SELECT min(id) FROM clients WHERE name LIKE 'explain-seed-%'")).scalar()
+    return user_id, client_id
+
+
+def _filters(spec, user_id, client_id):
+    return checklist_filters(
+        user_id=user_id if spec.get("user") else None,
+        client_id=client_id if spec.get("client") else None,
+        statuses=spec.get("statuses"),
+        date_from=datetime.now() - timedelta(days=spec["days"]) if "days" in spec else None,
+    )
+
+
+class _Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(_Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def _nodes(plan):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _nodes(child)
+
+
+def _explain(conn, query):
+    row = conn.execute(_Explain(query.statement)).scalar()
+    plan = row if isinstance(row, list) else json.loads(row)
+    return list(_nodes(plan[0]["Plan"]))
+
+
+def run():
+    db = SessionLocal()
+    failures = 0
+    try:
+        conn = db.connection()
+        user_id, client_id = _seed(conn)
+        cursor = encode_cursor([datetime.now() - timedelta(days=1), 0])
+        for label, (spec, expected) in CASES.items():
+            for page, cur in (("1ª página", None), ("com cursor", cursor)):
+                query, _ = paginate(db.query(Checklist).filter(*_filters(spec, user_id, client_id)), CHECKLIST_ORDER, cur)
+                nodes = _explain(conn, query)
+                indexes = sorted({n["Index Name"] for n in nodes if n.get("Relation Name") == "checklists" and "Index Name" in n})
+                seq = any(n["Node Type"] == "Seq Scan" and n.get("Relation Name") == "checklists" for n in nodes)
+                ok = not seq and indexes == [expected]
+                failures += not ok
+                used = ", ".join(indexes) or "Seq Scan"
+                print(f"{'✅' if ok else '❌'} {label:<28} {page:<11} {used}" + ("" if ok else f" (esperado {expected})"))
+    finally:
+        db.rollback()
+        db.close()
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if run() else 0)